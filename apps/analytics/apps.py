@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.analytics'
\ No newline at end of file
+    name = 'apps.analytics'
+    
+    def ready(self):
+        import apps.analytics.signals
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.payments.models import PaymentPlan
+from .views import invalidate_merchant_analytics
+
+@receiver([post_save, post_delete], sender=PaymentPlan)
+def invalidate_analytics_on_plan_change(sender, instance, **kwargs):
+    """Drop the merchant's cached analytics when one of their plans changes"""
+    invalidate_merchant_analytics(instance.merchant_id)
+
+# Installment changes invalidate from the payments status signals, which
+# already load the plan and its merchant_id
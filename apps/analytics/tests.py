@@ -1,3 +1,63 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from apps.payments.test_data_seeder import TestDataSeeder
+
+# Keep cached responses in this process even when CACHE_URL points at Redis
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bnpl-analytics-tests',
+    }
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MerchantAnalyticsCacheTestCase(APITestCase):
+    """Test per-merchant caching of analytics responses"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.seeder = TestDataSeeder()
+        cls.merchant = cls.seeder.create_merchant()
+        cls.payment_plan = cls.seeder.create_payment_plan(merchant=cls.merchant)
+    
+    def setUp(self):
+        # Cached responses are keyed on user ids, which test databases reuse
+        cache.clear()
+        token = RefreshToken.for_user(self.merchant).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    
+    def get_total_plans(self):
+        response = self.client.get(reverse('merchant_analytics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['overview']['total_plans']
+    
+    def test_analytics_response_is_cached(self):
+        """Repeated requests are served from the cache without hitting the database"""
+        self.assertEqual(self.get_total_plans(), 1)
+        
+        with self.assertNumQueries(1):  # JWT user lookup only
+            self.assertEqual(self.get_total_plans(), 1)
+    
+    def test_plan_change_invalidates_cached_analytics(self):
+        """Creating a plan drops the merchant's cached analytics"""
+        self.assertEqual(self.get_total_plans(), 1)
+        
+        self.seeder.create_payment_plan(merchant=self.merchant)
+        
+        self.assertEqual(self.get_total_plans(), 2)
+    
+    def test_installment_change_invalidates_cached_analytics(self):
+        """Saving an installment drops the merchant's cached analytics"""
+        response = self.client.get(reverse('merchant_analytics'))
+        self.assertEqual(response.data['installments']['total_installments'], 0)
+        
+        self.seeder.create_installment(self.payment_plan)
+        
+        response = self.client.get(reverse('merchant_analytics'))
+        self.assertEqual(response.data['installments']['total_installments'], 1)
@@ -2,52 +2,104 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import permissions
 from django.db.models import Sum, Count, Q
+from django.db.models.functions import TruncMonth
 from apps.payments.models import PaymentPlan, Installment
 from apps.authentication.permissions import IsMerchant
-from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+from functools import wraps
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Analytics views wrapped in cache_per_merchant, invalidated together
+CACHED_ANALYTICS_VIEWS = ('merchant_analytics', 'payment_trends')
+
+def analytics_cache_key(view_name, merchant_id):
+    """Cache key for one merchant's response from an analytics view"""
+    return f"analytics:{view_name}:{merchant_id}"
+
+def invalidate_merchant_analytics(merchant_id):
+    """Drop every cached analytics response for a merchant"""
+    try:
+        cache.delete_many([
+            analytics_cache_key(view_name, merchant_id)
+            for view_name in CACHED_ANALYTICS_VIEWS
+        ])
+    except Exception as e:
+        logger.warning(f"Analytics cache invalidation failed for merchant {merchant_id}: {e}")
+
+def cache_per_merchant(view_func):
+    """
+    Cache the response data of an analytics view per merchant.
+    Runs inside the DRF view so the JWT-authenticated user is available
+    for the cache key; cache errors fall through to the uncached view.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        cache_key = analytics_cache_key(view_func.__name__, request.user.id)
+        try:
+            data = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Analytics cache read failed for {cache_key}: {e}")
+            return view_func(request, *args, **kwargs)
+        
+        if data is not None:
+            return Response(data)
+        
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            try:
+                cache.set(cache_key, response.data, settings.ANALYTICS_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Analytics cache write failed for {cache_key}: {e}")
+        return response
+    return wrapper
 
 @api_view(['GET'])
 @permission_classes([IsMerchant])
+@cache_per_merchant
 def merchant_analytics(request):
     """
     Get comprehensive analytics for merchants
     """
     merchant = request.user
-    plans = PaymentPlan.objects.filter(merchant=merchant)
+    # Timezone-aware cutoff so the DateTimeField comparison needs no cast
+    thirty_days_ago = timezone.now() - timedelta(days=30)
     
-    # Basic metrics
-    total_plans = plans.count()
-    active_plans = plans.filter(status='active').count()
-    completed_plans = plans.filter(status='completed').count()
+    # Plan metrics, revenue and recent activity in a single query
+    plan_stats = PaymentPlan.objects.filter(merchant=merchant).aggregate(
+        total_plans=Count('id'),
+        active_plans=Count('id', filter=Q(status='active')),
+        completed_plans=Count('id', filter=Q(status='completed')),
+        total_revenue=Sum('total_amount'),
+        completed_revenue=Sum('total_amount', filter=Q(status='completed')),
+        recent_plans=Count('id', filter=Q(created_at__gte=thirty_days_ago)),
+    )
     
-    # Revenue metrics
-    total_revenue = plans.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    completed_revenue = plans.filter(status='completed').aggregate(
-        Sum('total_amount')
-    )['total_amount__sum'] or 0
+    # Installment metrics in a single query
+    installment_stats = Installment.objects.filter(payment_plan__merchant=merchant).aggregate(
+        total_installments=Count('id'),
+        paid_installments=Count('id', filter=Q(status='paid')),
+        pending_installments=Count('id', filter=Q(status='pending')),
+        late_installments=Count('id', filter=Q(status='late')),
+        recent_payments=Count('id', filter=Q(paid_date__gte=thirty_days_ago, status='paid')),
+    )
     
-    # Installment metrics
-    all_installments = Installment.objects.filter(payment_plan__merchant=merchant)
-    paid_installments = all_installments.filter(status='paid').count()
-    pending_installments = all_installments.filter(status='pending').count()
-    late_installments = all_installments.filter(status='late').count()
+    total_plans = plan_stats['total_plans']
+    total_revenue = plan_stats['total_revenue'] or 0
+    completed_revenue = plan_stats['completed_revenue'] or 0
     
     # Success rate
-    success_rate = (completed_plans / total_plans * 100) if total_plans > 0 else 0
-    
-    # Recent activity (last 30 days)
-    thirty_days_ago = date.today() - timedelta(days=30)
-    recent_plans = plans.filter(created_at__gte=thirty_days_ago).count()
-    recent_payments = all_installments.filter(
-        paid_date__gte=thirty_days_ago,
-        status='paid'
-    ).count()
+    success_rate = (plan_stats['completed_plans'] / total_plans * 100) if total_plans > 0 else 0
     
     return Response({
         'overview': {
             'total_plans': total_plans,
-            'active_plans': active_plans,
-            'completed_plans': completed_plans,
+            'active_plans': plan_stats['active_plans'],
+            'completed_plans': plan_stats['completed_plans'],
             'success_rate': round(success_rate, 2),
         },
         'revenue': {
@@ -56,43 +108,57 @@ def merchant_analytics(request):
             'pending_revenue': float(total_revenue - completed_revenue),
         },
         'installments': {
-            'total_installments': all_installments.count(),
-            'paid_installments': paid_installments,
-            'pending_installments': pending_installments,
-            'late_installments': late_installments,
+            'total_installments': installment_stats['total_installments'],
+            'paid_installments': installment_stats['paid_installments'],
+            'pending_installments': installment_stats['pending_installments'],
+            'late_installments': installment_stats['late_installments'],
         },
         'recent_activity': {
-            'new_plans_last_30_days': recent_plans,
-            'payments_last_30_days': recent_payments,
+            'new_plans_last_30_days': plan_stats['recent_plans'],
+            'payments_last_30_days': installment_stats['recent_payments'],
         }
     })
 
 @api_view(['GET'])
 @permission_classes([IsMerchant])
+@cache_per_merchant
 def payment_trends(request):
     """
     Get payment trends for the last 6 months
     """
     merchant = request.user
-    trends = []
     
-    for i in range(6):
-        start_date = date.today().replace(day=1) - timedelta(days=30*i)
-        end_date = (start_date + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        month_payments = Installment.objects.filter(
-            payment_plan__merchant=merchant,
-            paid_date__range=[start_date, end_date],
-            status='paid'
-        ).aggregate(
-            total=Sum('amount'),
-            count=Count('id')
-        )
-        
+    # First day of each of the last 6 months, oldest first
+    current_month = date.today().replace(day=1)
+    months = []
+    for i in range(5, -1, -1):
+        year, month = divmod(current_month.year * 12 + current_month.month - 1 - i, 12)
+        months.append(date(year, month + 1, 1))
+    
+    # Single GROUP BY month query instead of one aggregate per month
+    monthly_payments = Installment.objects.filter(
+        payment_plan__merchant=merchant,
+        status='paid',
+        paid_date__gte=timezone.make_aware(datetime.combine(months[0], time.min))
+    ).annotate(
+        month=TruncMonth('paid_date')
+    ).values('month').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('month')
+    
+    payments_by_month = {
+        row['month'].strftime('%Y-%m'): row for row in monthly_payments
+    }
+    
+    trends = []
+    for month_start in months:
+        key = month_start.strftime('%Y-%m')
+        month_payments = payments_by_month.get(key, {})
         trends.append({
-            'month': start_date.strftime('%Y-%m'),
-            'total_amount': float(month_payments['total'] or 0),
-            'payment_count': month_payments['count'] or 0,
+            'month': key,
+            'total_amount': float(month_payments.get('total') or 0),
+            'payment_count': month_payments.get('count') or 0,
         })
     
-    return Response({'trends': list(reversed(trends))})
\ No newline at end of file
+    return Response({'trends': trends})
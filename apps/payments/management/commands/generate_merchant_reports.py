@@ -7,6 +7,12 @@ import logging
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Merchants fetched per database round trip when streaming
+MERCHANT_CHUNK_SIZE = 500
+
+# Merchant reports generated per queued Celery task in async mode
+REPORT_TASK_CHUNK_SIZE = 100
+
 class Command(BaseCommand):
     help = 'Generate payment reports for merchants using Celery tasks'
     
@@ -114,7 +120,8 @@ class Command(BaseCommand):
     
     def generate_all_reports(self, options):
         """Generate reports for all merchants"""
-        merchants = User.objects.filter(user_type='merchant')
+        # Only the id and email columns are needed; rows are streamed below
+        merchants = User.objects.filter(user_type='merchant').values_list('id', 'email')
         merchant_count = merchants.count()
         
         if merchant_count == 0:
@@ -124,32 +131,43 @@ class Command(BaseCommand):
         self.stdout.write(f"Generating reports for {merchant_count} merchants")
         
         if options['dry_run']:
-            for merchant in merchants:
-                self.stdout.write(f"  Would generate report for: {merchant.email}")
+            for _, merchant_email in merchants.iterator(chunk_size=MERCHANT_CHUNK_SIZE):
+                self.stdout.write(f"  Would generate report for: {merchant_email}")
             self.stdout.write(self.style.WARNING(f"DRY RUN: Would generate {merchant_count} reports"))
             return
         
-        task_ids = []
-        for merchant in merchants:
-            if options['async']:
-                task = generate_merchant_payment_report.delay(merchant.id)
-                task_ids.append(task.id)
-                self.stdout.write(f"  Queued report for {merchant.email}: {task.id}")
+        if options['async']:
+            # Queue reports in chunks so each message carries many merchants
+            # One (merchant_id,) argument tuple per report
+            merchant_args = list(merchants.values_list('id'))
+            result = generate_merchant_payment_report.chunks(
+                merchant_args, REPORT_TASK_CHUNK_SIZE
+            ).apply_async()
+            
+            for task in result.results:
+                self.stdout.write(f"  Queued report chunk: {task.id}")
+            
+            self.stdout.write(
+                f"All {len(merchant_args)} reports queued in {len(result.results)} chunk tasks"
+            )
+            return
+        
+        merchant_rows = merchants.iterator(chunk_size=MERCHANT_CHUNK_SIZE)
+        for position, (merchant_id, merchant_email) in enumerate(merchant_rows, start=1):
+            result = generate_merchant_payment_report(merchant_id)
+            if 'error' in result:
+                self.stdout.write(
+                    self.style.ERROR(f"  Failed for {merchant_email}: {result['error']}")
+                )
             else:
-                result = generate_merchant_payment_report(merchant.id)
-                if 'error' in result:
-                    self.stdout.write(
-                        self.style.ERROR(f"  Failed for {merchant.email}: {result['error']}")
-                    )
-                else:
-                    self.stdout.write(
-                        self.style.SUCCESS(f"  Generated report for {merchant.email}")
-                    )
+                self.stdout.write(
+                    self.style.SUCCESS(f"  Generated report for {merchant_email}")
+                )
+            
+            if position % MERCHANT_CHUNK_SIZE == 0:
+                self.stdout.flush()
         
-        if options['async']:
-            self.stdout.write(f"All {len(task_ids)} report tasks queued")
-        else:
-            self.stdout.write(f"All {merchant_count} reports generated")
+        self.stdout.write(f"All {merchant_count} reports generated")
     
     def display_report_summary(self, result):
         """Display a summary of the generated report"""
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
+from django.db.models import DateField, DurationField, ExpressionWrapper, F, Value
 from datetime import date, timedelta
-from apps.payments.models import Installment, PaymentPlan
+from apps.payments.models import Installment
 from apps.payments.signals import mark_all_overdue_installments, get_overdue_installments_report
 import logging
 
@@ -67,7 +68,20 @@ class Command(BaseCommand):
                 due_date__lt=cutoff_date if days_overdue > 0 else date.today()
             )
             
-            overdue_count = overdue_query.count()
+            # Dry run lists every row, so fetch once and count in Python,
+            # loading only the columns the listing prints
+            if options['dry_run']:
+                overdue_installments = list(
+                    overdue_query.only('id', 'due_date', 'payment_plan').annotate(
+                        days_late=ExpressionWrapper(
+                            Value(date.today(), output_field=DateField()) - F('due_date'),
+                            output_field=DurationField()
+                        )
+                    )
+                )
+                overdue_count = len(overdue_installments)
+            else:
+                overdue_count = overdue_query.count()
             
             if overdue_count == 0:
                 self.stdout.write(self.style.SUCCESS("No overdue installments found."))
@@ -76,15 +90,21 @@ class Command(BaseCommand):
             # Dry run mode
             if options['dry_run']:
                 self.stdout.write(self.style.WARNING(f"DRY RUN: Would mark {overdue_count} installments as late:"))
-                for installment in overdue_query:
-                    days_late = (date.today() - installment.due_date).days
-                    self.stdout.write(f"  - Installment {installment.id} (Plan {installment.payment_plan.id}) - {days_late} days late")
+                for installment in overdue_installments:
+                    self.stdout.write(f"  - Installment {installment.id} (Plan {installment.payment_plan_id}) - {installment.days_late.days} days late")
                 return
             
             # Perform the update
             self.stdout.write(f"Marking {overdue_count} overdue installments as late...")
             
-            updated_count = mark_all_overdue_installments()
+            # Capture affected plans before the update changes the rows
+            affected_plans = list(
+                overdue_query.values_list(
+                    'payment_plan_id', 'payment_plan__user_email'
+                ).order_by('payment_plan_id').distinct()
+            )
+            
+            updated_count = mark_all_overdue_installments(cutoff_date)
             
             if updated_count > 0:
                 self.stdout.write(
@@ -92,16 +112,11 @@ class Command(BaseCommand):
                 )
                 
                 # Log affected payment plans
-                affected_plans = PaymentPlan.objects.filter(
-                    installments__status='late',
-                    installments__updated_at__gte=timezone.now() - timedelta(minutes=1)
-                ).distinct()
-                
-                if affected_plans.exists():
-                    self.stdout.write(f"Affected payment plans: {affected_plans.count()}")
+                if affected_plans:
+                    self.stdout.write(f"Affected payment plans: {len(affected_plans)}")
                     if options['verbose']:
-                        for plan in affected_plans:
-                            self.stdout.write(f"  - Plan {plan.id}: {plan.user_email}")
+                        for plan_id, user_email in affected_plans:
+                            self.stdout.write(f"  - Plan {plan_id}: {user_email}")
             else:
                 self.stdout.write(self.style.WARNING("No installments were updated"))
                 
@@ -128,7 +143,7 @@ class Command(BaseCommand):
                 days_late = (date.today() - installment.due_date).days
                 self.stdout.write(
                     f"Installment {installment.id}: "
-                    f"Plan {installment.payment_plan.id}, "
+                    f"Plan {installment.payment_plan_id}, "
                     f"Due: {installment.due_date}, "
                     f"Days Late: {days_late}, "
                     f"Amount: {installment.amount}"
@@ -137,9 +152,11 @@ class Command(BaseCommand):
         if report['overdue_plans']:
             self.stdout.write(f"\nAffected Payment Plans: {len(report['overdue_plans'])}")
             if verbose:
-                for plan_id, plan_data in report['overdue_plans'].items():
-                    plan = plan_data['payment_plan']
-                    overdue_count = len(plan_data['overdue_installments'])
-                    self.stdout.write(f"  Plan {plan_id}: {overdue_count} overdue installments ({plan.user_email})")
+                for plan_row in report['overdue_plans']:
+                    self.stdout.write(
+                        f"  Plan {plan_row['payment_plan_id']}: "
+                        f"{plan_row['overdue_count']} overdue installments "
+                        f"({plan_row['payment_plan__user_email']})"
+                    )
         
         self.stdout.write("="*50 + "\n")
\ No newline at end of file
@@ -5,9 +5,12 @@ from apps.payments.tasks import (
     send_bulk_payment_reminders,
     send_overdue_payment_reminders,
     daily_payment_reminders,
-    send_payment_reminder
+    summarize_daily_payment_reminders,
+    send_payment_reminder,
+    REMINDER_STATUSES
 )
 from apps.payments.models import Installment
+from django.db.models import Count, Q
 import logging
 
 logger = logging.getLogger(__name__)
@@ -78,7 +81,7 @@ class Command(BaseCommand):
         installment_id = options['installment_id']
         
         try:
-            installment = Installment.objects.get(id=installment_id)
+            installment = Installment.objects.only('id', 'due_date', 'status', 'amount').get(id=installment_id)
             days_until_due = (installment.due_date - date.today()).days
             
             self.stdout.write(f"Sending reminder for installment {installment_id}")
@@ -91,7 +94,9 @@ class Command(BaseCommand):
                 return
             
             if options['async']:
-                task = send_payment_reminder.delay(installment_id, days_until_due)
+                task = send_payment_reminder.apply_async(
+                    args=[installment_id, days_until_due], ignore_result=True
+                )
                 self.stdout.write(f"Task queued: {task.id}")
             else:
                 result = send_payment_reminder(installment_id, days_until_due)
@@ -105,26 +110,28 @@ class Command(BaseCommand):
         self.stdout.write("Running daily payment reminders batch...")
         
         if options['dry_run']:
-            # Simulate what would be sent
+            # Simulate what would be sent, counting every bucket in one query
+            today = date.today()
             days_list = [3, 1, 0]  # 3-day, 1-day, due today
-            total_count = 0
+            target_dates = {days: today + timedelta(days=days) for days in days_list}
+            
+            upcoming_filter = Q(due_date__in=list(target_dates.values()), status__in=REMINDER_STATUSES)
+            overdue_filter = Q(status='pending', due_date__lt=today)
+            
+            bucket_counts = {
+                f'days_{days}': Count('id', filter=Q(due_date=target_date, status__in=REMINDER_STATUSES))
+                for days, target_date in target_dates.items()
+            }
+            counts = Installment.objects.filter(upcoming_filter | overdue_filter).aggregate(
+                overdue=Count('id', filter=overdue_filter),
+                **bucket_counts
+            )
             
             for days in days_list:
-                target_date = date.today() + timedelta(days=days)
-                count = Installment.objects.filter(
-                    due_date=target_date,
-                    status__in=['pending', 'late']
-                ).count()
-                total_count += count
-                self.stdout.write(f"  {days}-day reminders: {count} installments")
+                self.stdout.write(f"  {days}-day reminders: {counts[f'days_{days}']} installments")
             
-            # Overdue count
-            overdue_count = Installment.objects.filter(
-                status='pending',
-                due_date__lt=date.today()
-            ).count()
-            total_count += overdue_count
-            self.stdout.write(f"  Overdue reminders: {overdue_count} installments")
+            self.stdout.write(f"  Overdue reminders: {counts['overdue']} installments")
+            total_count = sum(counts.values())
             
             self.stdout.write(self.style.WARNING(f"DRY RUN: Would send {total_count} total reminders"))
             return
@@ -133,7 +140,14 @@ class Command(BaseCommand):
             task = daily_payment_reminders.delay()
             self.stdout.write(f"Daily batch task queued: {task.id}")
         else:
-            result = daily_payment_reminders()
+            # Run the batches in this process and total them the way the
+            # daily chord callback does
+            result = summarize_daily_payment_reminders([
+                send_bulk_payment_reminders(3),
+                send_bulk_payment_reminders(1),
+                send_bulk_payment_reminders(0),
+                send_overdue_payment_reminders()
+            ])
             self.display_batch_results(result)
     
     def send_overdue_reminders(self, options):
@@ -142,7 +156,7 @@ class Command(BaseCommand):
         
         if options['dry_run']:
             overdue_count = Installment.objects.filter(
-                status__in=['pending', 'late'],
+                status__in=REMINDER_STATUSES,
                 due_date__lt=date.today()
             ).count()
             self.stdout.write(self.style.WARNING(f"DRY RUN: Would send {overdue_count} overdue reminders"))
@@ -165,7 +179,7 @@ class Command(BaseCommand):
         if options['dry_run']:
             count = Installment.objects.filter(
                 due_date=target_date,
-                status__in=['pending', 'late']
+                status__in=REMINDER_STATUSES
             ).count()
             self.stdout.write(self.style.WARNING(f"DRY RUN: Would send {count} reminders"))
             return
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_installment_interest_component_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='installment',
+            index=models.Index(fields=['payment_plan', 'status'], name='payments_in_payment_7d643d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='installment',
+            index=models.Index(fields=['status', 'paid_date'], name='payments_in_status_834699_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='installment',
+            index=models.Index(fields=['status', 'due_date'], name='payments_in_status_ea9efe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentplan',
+            index=models.Index(fields=['merchant', 'status'], name='payments_pa_merchan_e53dea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentplan',
+            index=models.Index(fields=['merchant', 'created_at'], name='payments_pa_merchan_ccd6c8_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_add_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='installment',
+            index=models.Index(fields=['due_date', 'status'], name='payments_in_due_dat_c4375b_idx'),
+        ),
+    ]
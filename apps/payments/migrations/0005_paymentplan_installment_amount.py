@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:53
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def populate_installment_amount(apps, schema_editor):
+    from apps.payments.utils import calculate_pmt
+
+    PaymentPlan = apps.get_model('payments', 'PaymentPlan')
+    plans = PaymentPlan.objects.filter(installment_amount__isnull=True)
+    for plan in plans.iterator(chunk_size=500):
+        try:
+            amount = calculate_pmt(
+                plan.total_amount,
+                float(plan.interest_rate),
+                plan.number_of_installments,
+                plan.tenor_type
+            )
+        except Exception:
+            amount = (plan.total_amount / plan.number_of_installments).quantize(Decimal('0.01'))
+        PaymentPlan.objects.filter(pk=plan.pk).update(installment_amount=amount)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_installment_due_date_status_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentplan',
+            name='installment_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(populate_installment_amount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 00:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_paymentplan_installment_amount'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='installment',
+            name='payments_in_due_dat_c4375b_idx',
+        ),
+    ]
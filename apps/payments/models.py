@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
@@ -51,21 +53,112 @@ class PaymentPlan(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)],
         default=settings.DEFAULT_INTEREST_RATE
     )
+    # Stored PMT result, recalculated on save when its inputs change
+    installment_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Fields that installment_amount is calculated from
+    INSTALLMENT_AMOUNT_FIELDS = {'total_amount', 'interest_rate', 'number_of_installments', 'tenor_type'}
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Payment Plan'
         verbose_name_plural = 'Payment Plans'
+        indexes = [
+            models.Index(fields=['merchant', 'status']),
+            models.Index(fields=['merchant', 'created_at']),
+        ]
     
     def __str__(self):
         return f"Plan {self.id} - {self.user_email} - {self.total_amount} SAR"
     
-    @property
-    def installment_amount(self):
+    @classmethod
+    def optimized_queryset(cls):
+        """
+        Queryset for serializing plans with a constant number of queries:
+        merchant joined, installments prefetched with their overdue flag
+        and paid totals annotated
+        """
+        paid = models.Q(installments__status='paid')
+        return cls.objects.select_related('merchant').prefetch_related(
+            models.Prefetch(
+                'installments',
+                queryset=Installment.objects.only(
+                    'id', 'payment_plan', 'installment_number', 'amount', 'due_date',
+                    'status', 'paid_date', 'principal_component', 'interest_component'
+                ).annotate(
+                    is_overdue_db=models.Case(
+                        models.When(status='pending', due_date__lt=date.today(), then=models.Value(True)),
+                        default=models.Value(False),
+                        output_field=models.BooleanField()
+                    )
+                )
+            )
+        ).annotate(
+            paid_count=models.Count('installments', filter=paid),
+            paid_sum=Coalesce(
+                models.Sum('installments__amount', filter=paid),
+                Decimal('0.00'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2)
+            )
+        ).order_by(*cls._meta.ordering)  # Meta.ordering is dropped from GROUP BY queries
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the PMT inputs as loaded so save() can tell whether they changed
+        instance._loaded_installment_inputs = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.INSTALLMENT_AMOUNT_FIELDS
+        }
+        return instance
+    
+    def _installment_inputs_changed(self):
+        """Whether any PMT input differs from the values loaded from the database"""
+        loaded = getattr(self, '_loaded_installment_inputs', None)
+        if self._state.adding or loaded is None:
+            return True
+        # A stored amount that was never calculated, e.g. after bulk_create
+        if 'installment_amount' in self.__dict__ and self.installment_amount is None:
+            return True
+        
+        for name in self.INSTALLMENT_AMOUNT_FIELDS:
+            # Deferred inputs that were never assigned are unchanged
+            if name not in self.__dict__:
+                continue
+            if name not in loaded or self.__dict__[name] != loaded[name]:
+                return True
+        return False
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        
+        # Skip the PMT calculation for saves that only touch unrelated fields
+        # or leave its inputs as they were loaded
+        if (update_fields is None or self.INSTALLMENT_AMOUNT_FIELDS.intersection(update_fields)) \
+                and self._installment_inputs_changed():
+            self.installment_amount = self.calculate_installment_amount()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'installment_amount'}
+        
+        super().save(*args, **kwargs)
+        
+        self._loaded_installment_inputs = {
+            name: self.__dict__[name] for name in self.INSTALLMENT_AMOUNT_FIELDS
+            if name in self.__dict__
+        }
+    
+    def calculate_installment_amount(self):
         """Calculate installment amount using PMT formula with error handling"""
         try:
+            # utils imports this module, so the import stays local
             from .utils import calculate_pmt
             return calculate_pmt(
                 self.total_amount,
@@ -75,23 +168,26 @@ class PaymentPlan(models.Model):
             )
         except Exception:
             # Return a fallback calculation if PMT fails
-            return self.total_amount / self.number_of_installments
+            return (Decimal(self.total_amount) / self.number_of_installments).quantize(Decimal('0.01'))
     
     @property
     def paid_installments_count(self):
-        """Count of paid installments"""
+        """Count of paid installments, using the queryset annotation when present"""
+        if hasattr(self, 'paid_count'):
+            return self.paid_count
         return self.installments.filter(status='paid').count()
     
     @property
     def remaining_amount(self):
         """Calculate remaining amount to be paid with error handling"""
         try:
-            paid_installments = self.installments.filter(status='paid')
-            if not paid_installments.exists():
-                return self.total_amount
+            paid_amount = getattr(self, 'paid_sum', None)
+            if paid_amount is None:
+                paid_amount = self.installments.filter(status='paid').aggregate(
+                    total=models.Sum('amount')
+                )['total'] or Decimal('0.00')
             
-            paid_amount = sum(installment.amount for installment in paid_installments)
-            remaining = self.total_amount - paid_amount
+            remaining = (self.total_amount - paid_amount).quantize(Decimal('0.01'))
             
             # Ensure remaining amount is not negative
             return max(Decimal('0.00'), remaining)
@@ -144,6 +240,11 @@ class Installment(models.Model):
         unique_together = ['payment_plan', 'installment_number']
         verbose_name = 'Installment'
         verbose_name_plural = 'Installments'
+        indexes = [
+            models.Index(fields=['payment_plan', 'status']),
+            models.Index(fields=['status', 'paid_date']),
+            models.Index(fields=['status', 'due_date']),
+        ]
     
     def __str__(self):
         return f"Installment {self.installment_number} - {self.amount} SAR"
@@ -157,9 +258,15 @@ class Installment(models.Model):
     def mark_as_late_if_overdue(self):
         """Mark installment as late if overdue with validation"""
         try:
-            if self.is_overdue and self.status == 'pending':
+            # Conditional UPDATE so a concurrent payment is never overwritten
+            updated = Installment.objects.filter(
+                pk=self.pk,
+                status='pending',
+                due_date__lt=date.today()
+            ).update(status='late', updated_at=timezone.now())
+            
+            if updated:
                 self.status = 'late'
-                self.save(update_fields=['status', 'updated_at'])
                 return True
             return False
         except Exception as e:
@@ -1,4 +1,8 @@
 from rest_framework import permissions
+from .models import PaymentPlan, Installment
+
+# Installment statuses that can still be paid
+PAYABLE_STATUSES = frozenset(('pending', 'late'))
 
 class IsOwnerOrMerchant(permissions.BasePermission):
     """
@@ -6,21 +10,21 @@ class IsOwnerOrMerchant(permissions.BasePermission):
     """
     
     def has_object_permission(self, request, view, obj):
-        # For PaymentPlan objects
-        if hasattr(obj, 'user_email'):
-            return (
-                request.user.email == obj.user_email or 
-                obj.merchant == request.user
-            )
+        user = request.user
         
+        # For PaymentPlan objects
+        if isinstance(obj, PaymentPlan):
+            payment_plan = obj
         # For Installment objects
-        if hasattr(obj, 'payment_plan'):
-            return (
-                request.user.email == obj.payment_plan.user_email or 
-                obj.payment_plan.merchant == request.user
-            )
+        elif isinstance(obj, Installment):
+            payment_plan = obj.payment_plan
+        else:
+            return False
         
-        return False
+        return (
+            user.email == payment_plan.user_email or 
+            payment_plan.merchant_id == user.id
+        )
 
 class CanPayInstallment(permissions.BasePermission):
     """
@@ -44,16 +48,21 @@ class CanPayInstallment(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         user = request.user
         
+        if not isinstance(obj, Installment):
+            return False
+        
+        payment_plan = obj.payment_plan
+        
         # User must be the owner of the payment plan
-        if user.email != obj.payment_plan.user_email:
+        if user.email != payment_plan.user_email:
             return False
         
         # Installment must be payable (pending or late)
-        if obj.status not in ['pending', 'late']:
+        if obj.status not in PAYABLE_STATUSES:
             return False
             
         # Payment plan must be active
-        if obj.payment_plan.status != 'active':
+        if payment_plan.status != 'active':
             return False
             
         return True
\ No newline at end of file
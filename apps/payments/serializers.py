@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import PaymentPlan, Installment
-from datetime import date, timedelta
+from datetime import date
 from decimal import Decimal, InvalidOperation
 from django.core.exceptions import ValidationError
 from django.db import transaction
@@ -9,7 +9,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 class InstallmentSerializer(serializers.ModelSerializer):
-    is_overdue = serializers.ReadOnlyField()
+    is_overdue = serializers.SerializerMethodField()
     
     class Meta:
         model = Installment
@@ -19,6 +19,16 @@ class InstallmentSerializer(serializers.ModelSerializer):
             'principal_component', 'interest_component'
         ]
         read_only_fields = ['id', 'paid_date']
+    
+    def get_is_overdue(self, obj):
+        # Use the overdue flag computed in SQL when the queryset annotated it
+        is_overdue_db = getattr(obj, 'is_overdue_db', None)
+        if is_overdue_db is not None:
+            return is_overdue_db
+        
+        # Otherwise compare against the request's date instead of calling date.today() per row
+        today = self.context.get('today') or date.today()
+        return obj.status == 'pending' and obj.due_date < today
 
 class PaymentPlanCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -96,9 +106,10 @@ class PaymentPlanCreateSerializer(serializers.ModelSerializer):
                 # Calculate days per period
                 days_mapping = {'month': 30, 'week': 7, 'day': 1}
                 days_per_period = days_mapping.get(payment_plan.tenor_type, 30)
+                start_ordinal = payment_plan.start_date.toordinal()
                 
-                # Create installments
-                installments_created = []
+                # Build installments and insert them in a single statement
+                installments_to_create = []
                 for i, (total_pmt, principal_pmt, interest_pmt) in enumerate(amortization):
                     try:
                         # Validate payment components
@@ -106,22 +117,27 @@ class PaymentPlanCreateSerializer(serializers.ModelSerializer):
                             raise ValidationError(f"Invalid payment amounts for installment {i + 1}")
                         
                         # Calculate due date
-                        due_date = payment_plan.start_date + timedelta(days=days_per_period * i)
+                        due_date = date.fromordinal(start_ordinal + days_per_period * i)
                         
-                        installment = Installment.objects.create(
+                        installments_to_create.append(Installment(
                             payment_plan=payment_plan,
                             installment_number=i + 1,
                             amount=total_pmt,
                             principal_component=principal_pmt,
                             interest_component=interest_pmt,
                             due_date=due_date
-                        )
-                        installments_created.append(installment)
+                        ))
                         
                     except (ValidationError, InvalidOperation) as e:
                         logger.error(f"Error creating installment {i + 1}: {e}")
                         raise serializers.ValidationError(f"Failed to create installment {i + 1}: {str(e)}")
                 
+                # bulk_create skips post_save; new installments start pending on or
+                # after today, so the status and overdue signals have nothing to do
+                installments_created = Installment.objects.bulk_create(
+                    installments_to_create, batch_size=100
+                )
+                
                 logger.info(f"Created {len(installments_created)} installments for payment plan {payment_plan.id}")
                 
         except ValidationError as e:
@@ -134,7 +150,7 @@ class PaymentPlanCreateSerializer(serializers.ModelSerializer):
 class PaymentPlanSerializer(serializers.ModelSerializer):
     installments = InstallmentSerializer(many=True, read_only=True)
     merchant_name = serializers.CharField(source='merchant.username', read_only=True)
-    installment_amount = serializers.ReadOnlyField()
+    installment_amount = serializers.SerializerMethodField()
     paid_installments_count = serializers.ReadOnlyField()
     remaining_amount = serializers.ReadOnlyField()
     
@@ -148,3 +164,9 @@ class PaymentPlanSerializer(serializers.ModelSerializer):
             'tenor_type', 'interest_rate'
         ]
         read_only_fields = ['id', 'merchant', 'created_at', 'updated_at']
+    
+    def get_installment_amount(self, obj):
+        # Rows written by bulk_create or update() never stored the PMT result
+        if obj.installment_amount is None:
+            return obj.calculate_installment_amount()
+        return obj.installment_amount
@@ -1,12 +1,90 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
+from django.db.models import Count, F, Q
+from collections import defaultdict
 from datetime import date
 import logging
 from .models import Installment, PaymentPlan
+from apps.analytics.views import invalidate_merchant_analytics
 
 logger = logging.getLogger(__name__)
 
+# Plans read per database round trip, and plan ids per UPDATE, in bulk status updates
+STATUS_UPDATE_CHUNK_SIZE = 1000
+
+def get_installment_status_counts(payment_plan):
+    """
+    Count a payment plan's installments per status with a single GROUP BY query
+    Statuses without installments are absent from the returned dict
+    """
+    rows = payment_plan.installments.values('status').annotate(count=Count('id'))
+    return {row['status']: row['count'] for row in rows}
+
+def determine_payment_plan_status(current_status, total_count, status_counts):
+    """
+    Work out a payment plan's status from its installment counts per status
+    Returns (new_status, reason); reason is None when the status is unchanged
+    """
+    paid_count = status_counts.get('paid', 0)
+    cancelled_count = status_counts.get('cancelled', 0)
+    pending_count = status_counts.get('pending', 0)
+    late_count = status_counts.get('late', 0)
+    
+    # All installments paid -> completed
+    if paid_count == total_count and total_count > 0:
+        return 'completed', "completed - all installments paid"
+    
+    # All installments cancelled -> cancelled
+    if cancelled_count == total_count and total_count > 0:
+        return 'cancelled', "cancelled - all installments cancelled"
+    
+    # Payment plan was completed but now has non-paid installments -> reactivate
+    if current_status == 'completed' and paid_count < total_count:
+        return 'active', "reactivated - installment status changed"
+    
+    # Payment plan was cancelled but now has active installments -> reactivate
+    if current_status == 'cancelled' and (pending_count > 0 or late_count > 0 or paid_count > 0):
+        return 'active', "reactivated from cancelled status"
+    
+    return current_status, None
+
+def _recompute_plan_status(payment_plan, status_counts=None, total_count=None):
+    """
+    Recalculate a payment plan's status from its installments and store it if changed
+    total_count defaults to the plan's number_of_installments
+    Writes with a queryset UPDATE, so no PaymentPlan post_save signals fire
+    """
+    if status_counts is None:
+        status_counts = get_installment_status_counts(payment_plan)
+    if total_count is None:
+        total_count = payment_plan.number_of_installments
+    
+    new_status, reason = determine_payment_plan_status(
+        payment_plan.status,
+        total_count,
+        status_counts
+    )
+    if reason:
+        logger.info(f"Payment plan {payment_plan.id} {reason}")
+    
+    # Update status if changed
+    if new_status != payment_plan.status:
+        old_status = payment_plan.status
+        _set_payment_plan_status(payment_plan, new_status)
+        logger.info(f"Payment plan {payment_plan.id} status updated: {old_status} -> {new_status}")
+    
+    return new_status
+
+def _set_payment_plan_status(payment_plan, status):
+    """Store a new status on a payment plan and keep the in-memory instance in sync"""
+    payment_plan.status = status
+    payment_plan.updated_at = timezone.now()
+    PaymentPlan.objects.filter(pk=payment_plan.pk).update(
+        status=status,
+        updated_at=payment_plan.updated_at
+    )
+
 @receiver(post_save, sender=Installment)
 def update_payment_plan_status_on_save(sender, instance, created, **kwargs):
     """
@@ -14,57 +92,17 @@ def update_payment_plan_status_on_save(sender, instance, created, **kwargs):
     Handles completion, reactivation, and cancellation scenarios
     """
     try:
-        payment_plan = instance.payment_plan
-        
-        # Prevent recursive saves by checking if we're already updating
-        if hasattr(payment_plan, '_updating_status'):
-            return
-            
-        payment_plan._updating_status = True
+        if Installment.payment_plan.is_cached(instance):
+            # Reuse the caller's plan so its in-memory status stays current
+            payment_plan = instance.payment_plan
+        else:
+            # Status recalculation and cache invalidation only need these columns
+            payment_plan = PaymentPlan.objects.only(
+                'id', 'merchant_id', 'status', 'number_of_installments'
+            ).get(pk=instance.payment_plan_id)
         
-        try:
-            # Get current installment counts
-            installments = payment_plan.installments.all()
-            total_count = payment_plan.number_of_installments
-            paid_count = installments.filter(status='paid').count()
-            cancelled_count = installments.filter(status='cancelled').count()
-            pending_count = installments.filter(status='pending').count()
-            late_count = installments.filter(status='late').count()
-            
-            # Determine new status based on installment statuses
-            new_status = payment_plan.status
-            
-            # All installments paid -> completed
-            if paid_count == total_count and total_count > 0:
-                new_status = 'completed'
-                logger.info(f"Payment plan {payment_plan.id} completed - all installments paid")
-            
-            # All installments cancelled -> cancelled
-            elif cancelled_count == total_count and total_count > 0:
-                new_status = 'cancelled'
-                logger.info(f"Payment plan {payment_plan.id} cancelled - all installments cancelled")
-            
-            # Payment plan was completed but now has non-paid installments -> reactivate
-            elif payment_plan.status == 'completed' and paid_count < total_count:
-                new_status = 'active'
-                logger.info(f"Payment plan {payment_plan.id} reactivated - installment status changed")
-            
-            # Payment plan was cancelled but now has active installments -> reactivate
-            elif payment_plan.status == 'cancelled' and (pending_count > 0 or late_count > 0 or paid_count > 0):
-                new_status = 'active'
-                logger.info(f"Payment plan {payment_plan.id} reactivated from cancelled status")
-            
-            # Update status if changed
-            if new_status != payment_plan.status:
-                payment_plan.status = new_status
-                payment_plan.save(update_fields=['status', 'updated_at'])
-                logger.info(f"Payment plan {payment_plan.id} status updated: {payment_plan.status} -> {new_status}")
-                
-        finally:
-            # Clean up the flag
-            if hasattr(payment_plan, '_updating_status'):
-                delattr(payment_plan, '_updating_status')
-                
+        _recompute_plan_status(payment_plan)
+        invalidate_merchant_analytics(payment_plan.merchant_id)
     except Exception as e:
         logger.error(f"Error updating payment plan status for installment {instance.id}: {e}")
 
@@ -76,32 +114,26 @@ def update_payment_plan_status_on_delete(sender, instance, **kwargs):
     try:
         payment_plan = instance.payment_plan
         
-        # Prevent recursive operations
-        if hasattr(payment_plan, '_updating_status'):
-            return
-            
-        payment_plan._updating_status = True
+        # The deleted installment is no longer part of the schedule; shrink the
+        # plan with it so the save path measures status against the same total
+        PaymentPlan.objects.filter(
+            pk=payment_plan.pk, number_of_installments__gt=0
+        ).update(number_of_installments=F('number_of_installments') - 1)
+        if payment_plan.number_of_installments > 0:
+            payment_plan.number_of_installments -= 1
         
-        try:
-            # Recalculate status after installment deletion
-            remaining_installments = payment_plan.installments.all()
-            
-            if remaining_installments.count() == 0:
-                # No installments left - reset to active if not cancelled
-                if payment_plan.status != 'cancelled':
-                    payment_plan.status = 'active'
-                    payment_plan.save(update_fields=['status', 'updated_at'])
-                    logger.info(f"Payment plan {payment_plan.id} reset to active - no installments remaining")
-            else:
-                # Trigger status recalculation by touching an installment
-                first_installment = remaining_installments.first()
-                if first_installment:
-                    # This will trigger the post_save signal above
-                    first_installment.save(update_fields=['updated_at'])
-                    
-        finally:
-            if hasattr(payment_plan, '_updating_status'):
-                delattr(payment_plan, '_updating_status')
+        # Recalculate status after installment deletion
+        status_counts = get_installment_status_counts(payment_plan)
+        
+        if not status_counts:
+            # No installments left - reset to active if not cancelled
+            if payment_plan.status != 'cancelled':
+                _set_payment_plan_status(payment_plan, 'active')
+                logger.info(f"Payment plan {payment_plan.id} reset to active - no installments remaining")
+        else:
+            _recompute_plan_status(payment_plan, status_counts)
+        
+        invalidate_merchant_analytics(payment_plan.merchant_id)
                 
     except Exception as e:
         logger.error(f"Error updating payment plan status after installment deletion: {e}")
@@ -118,12 +150,12 @@ def validate_payment_plan_status(sender, instance, created, **kwargs):
         
     try:
         # Check for status inconsistencies
-        installments = instance.installments.all()
+        status_counts = get_installment_status_counts(instance)
         
-        if installments.exists():
-            paid_count = installments.filter(status='paid').count()
+        if status_counts:
+            paid_count = status_counts.get('paid', 0)
             total_count = instance.number_of_installments
-            cancelled_count = installments.filter(status='cancelled').count()
+            cancelled_count = status_counts.get('cancelled', 0)
             
             # Log potential inconsistencies
             if instance.status == 'completed' and paid_count < total_count:
@@ -144,10 +176,9 @@ def trigger_payment_plan_status_update(payment_plan):
     Useful for batch operations or manual corrections
     """
     try:
-        if payment_plan.installments.exists():
-            # Trigger signal by saving the first installment
-            first_installment = payment_plan.installments.first()
-            first_installment.save(update_fields=['updated_at'])
+        status_counts = get_installment_status_counts(payment_plan)
+        if status_counts:
+            _recompute_plan_status(payment_plan, status_counts)
         else:
             logger.warning(f"Payment plan {payment_plan.id} has no installments for status update")
     except Exception as e:
@@ -159,18 +190,36 @@ def bulk_update_payment_plan_statuses():
     Useful for data migration or fixing inconsistencies
     """
     try:
-        payment_plans = PaymentPlan.objects.all()
+        # Installment counts per status for every plan, streamed from one aggregate query
+        plans = PaymentPlan.objects.order_by('id').annotate(
+            installment_count=Count('installments'),
+            paid=Count('installments', filter=Q(installments__status='paid')),
+            cancelled=Count('installments', filter=Q(installments__status='cancelled')),
+            pending=Count('installments', filter=Q(installments__status='pending')),
+            late=Count('installments', filter=Q(installments__status='late'))
+        ).filter(installment_count__gt=0).values_list(
+            'id', 'status', 'number_of_installments', 'paid', 'cancelled', 'pending', 'late'
+        )
+        
+        plan_ids_by_status = defaultdict(list)
         updated_count = 0
         
-        for payment_plan in payment_plans:
-            old_status = payment_plan.status
-            trigger_payment_plan_status_update(payment_plan)
+        for plan_id, old_status, total_count, paid, cancelled, pending, late in plans.iterator(
+            chunk_size=STATUS_UPDATE_CHUNK_SIZE
+        ):
+            status_counts = {'paid': paid, 'cancelled': cancelled, 'pending': pending, 'late': late}
+            new_status, _ = determine_payment_plan_status(old_status, total_count, status_counts)
             
-            # Refresh from database to check if status changed
-            payment_plan.refresh_from_db()
-            if payment_plan.status != old_status:
+            if new_status != old_status:
+                plan_ids_by_status[new_status].append(plan_id)
                 updated_count += 1
-                logger.info(f"Updated payment plan {payment_plan.id}: {old_status} -> {payment_plan.status}")
+                logger.info(f"Updated payment plan {plan_id}: {old_status} -> {new_status}")
+                
+                if len(plan_ids_by_status[new_status]) >= STATUS_UPDATE_CHUNK_SIZE:
+                    _apply_payment_plan_status(new_status, plan_ids_by_status.pop(new_status))
+        
+        for new_status, plan_ids in plan_ids_by_status.items():
+            _apply_payment_plan_status(new_status, plan_ids)
         
         logger.info(f"Bulk status update completed: {updated_count} payment plans updated")
         return updated_count
@@ -179,6 +228,10 @@ def bulk_update_payment_plan_statuses():
         logger.error(f"Error during bulk payment plan status update: {e}")
         return 0
 
+def _apply_payment_plan_status(status, plan_ids):
+    """Set one status on a batch of payment plans with a single UPDATE"""
+    PaymentPlan.objects.filter(id__in=plan_ids).update(status=status, updated_at=timezone.now())
+
 @receiver(post_save, sender=Installment)
 def check_overdue_on_save(sender, instance, created, **kwargs):
     """
@@ -186,50 +239,62 @@ def check_overdue_on_save(sender, instance, created, **kwargs):
     This provides real-time overdue detection
     """
     try:
-        # Only check for pending installments
-        if instance.status == 'pending' and instance.is_overdue:
-            logger.info(f"Marking overdue installment {instance.id} as late")
-            
-            # Use update to avoid triggering this signal again
-            Installment.objects.filter(id=instance.id).update(
-                status='late',
-                updated_at=timezone.now()
-            )
-            
-            # Log the change
+        # Most saves are for paid or not-yet-due installments; skip them before touching the DB
+        if instance.status != 'pending' or instance.due_date >= date.today():
+            return
+        
+        logger.info(f"Marking overdue installment {instance.id} as late")
+        
+        # Use update to avoid triggering this signal again; the status filter
+        # keeps a concurrent payment from being overwritten
+        updated = Installment.objects.filter(id=instance.id, status='pending').update(
+            status='late',
+            updated_at=timezone.now()
+        )
+        
+        # Log the change
+        if updated:
             logger.info(f"Installment {instance.id} marked as late due to overdue date: {instance.due_date}")
             
     except Exception as e:
         logger.error(f"Error checking overdue status for installment {instance.id}: {e}")
 
-def mark_all_overdue_installments():
+def mark_all_overdue_installments(cutoff_date=None):
     """
     Mark all overdue pending installments as late
     This function can be called manually or by scheduled tasks
+    Installments due before cutoff_date (default: today) are marked
     """
     try:
+        cutoff_date = cutoff_date or date.today()
+        
         # Find all overdue pending installments
         overdue_installments = Installment.objects.filter(
             status='pending',
-            due_date__lt=date.today()
+            due_date__lt=cutoff_date
         )
         
-        count = overdue_installments.count()
-        if count == 0:
-            logger.info("No overdue installments found")
-            return 0
+        # Per-row details are only worth a SELECT when debug logging is on;
+        # the filter stops matching these rows once they are updated
+        marked_rows = []
+        if logger.isEnabledFor(logging.DEBUG):
+            marked_rows = list(overdue_installments.values_list('id', 'payment_plan_id', 'due_date'))
         
-        # Update all at once for efficiency
+        # Single UPDATE; the affected row count tells us whether anything was overdue
         updated_count = overdue_installments.update(
             status='late',
             updated_at=timezone.now()
         )
         
+        if updated_count == 0:
+            logger.info("No overdue installments found")
+            return 0
+        
         logger.info(f"Marked {updated_count} overdue installments as late")
         
         # Log details of marked installments
-        for installment in overdue_installments:
-            logger.info(f"Installment {installment.id} (plan {installment.payment_plan.id}) marked late - due: {installment.due_date}")
+        for installment_id, payment_plan_id, due_date in marked_rows:
+            logger.debug(f"Installment {installment_id} (plan {payment_plan_id}) marked late - due: {due_date}")
         
         return updated_count
         
@@ -263,40 +328,46 @@ def get_overdue_installments_report():
     Returns a dictionary with statistics and details
     """
     try:
+        today = date.today()
+        
         # Get overdue pending installments
         overdue_pending = Installment.objects.filter(
             status='pending',
-            due_date__lt=date.today()
-        ).select_related('payment_plan', 'payment_plan__merchant')
+            due_date__lt=today
+        ).select_related('payment_plan')
         
         # Get already marked late installments
         late_installments = Installment.objects.filter(
             status='late'
-        ).select_related('payment_plan', 'payment_plan__merchant')
+        ).select_related('payment_plan')
         
-        # Calculate statistics
-        overdue_count = overdue_pending.count()
-        late_count = late_installments.count()
+        # Both lists are returned in full, so count them in Python
+        overdue_installments = list(overdue_pending)
+        late_installments = list(late_installments)
+        overdue_count = len(overdue_installments)
+        late_count = len(late_installments)
         
-        # Group by payment plan
-        overdue_plans = {}
-        for installment in overdue_pending:
-            plan_id = installment.payment_plan.id
-            if plan_id not in overdue_plans:
-                overdue_plans[plan_id] = {
-                    'payment_plan': installment.payment_plan,
-                    'overdue_installments': []
+        # Group the fetched overdue installments by payment plan
+        plan_rows = {}
+        for installment in overdue_installments:
+            row = plan_rows.get(installment.payment_plan_id)
+            if row is None:
+                row = plan_rows[installment.payment_plan_id] = {
+                    'payment_plan_id': installment.payment_plan_id,
+                    'payment_plan__user_email': installment.payment_plan.user_email,
+                    'overdue_count': 0
                 }
-            overdue_plans[plan_id]['overdue_installments'].append(installment)
+            row['overdue_count'] += 1
+        overdue_plans = [plan_rows[plan_id] for plan_id in sorted(plan_rows)]
         
         return {
             'overdue_pending_count': overdue_count,
             'late_count': late_count,
             'total_overdue': overdue_count + late_count,
             'overdue_plans': overdue_plans,
-            'overdue_installments': list(overdue_pending),
-            'late_installments': list(late_installments),
-            'report_date': date.today()
+            'overdue_installments': overdue_installments,
+            'late_installments': late_installments,
+            'report_date': today
         }
         
     except Exception as e:
@@ -1,87 +1,167 @@
-from celery import shared_task
+from celery import shared_task, chord, group
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from datetime import date, timedelta
+from functools import lru_cache
+from itertools import islice
 import logging
 from .models import Installment, PaymentPlan
 from .signals import mark_all_overdue_installments
 
 logger = logging.getLogger(__name__)
+User = get_user_model()
 
-@shared_task(bind=True, max_retries=3)
+# Installment statuses that still receive payment reminders
+REMINDER_STATUSES = ('pending', 'late')
+
+# Installment statuses that never receive a reminder
+CLOSED_STATUSES = frozenset(('paid', 'cancelled'))
+
+# Installment ids fetched per database round trip when fanning out reminders
+REMINDER_QUERY_CHUNK_SIZE = 2000
+
+# Reminders sent per queued Celery batch task
+REMINDER_TASK_CHUNK_SIZE = 100
+
+# Installment and plan columns used to build a reminder email
+REMINDER_FIELDS = (
+    'id', 'installment_number', 'amount', 'due_date', 'status',
+    'payment_plan__id', 'payment_plan__user_email', 'payment_plan__number_of_installments'
+)
+
+def _batched(iterable, size):
+    """Yield lists of up to size items from iterable without materializing it"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=60,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=3,
+    ignore_result=True,
+    acks_late=True
+)
 def send_payment_reminder(self, installment_id, days_until_due=None):
     """
     Send a payment reminder for a specific installment
+    Failures are retried by Celery with jittered exponential backoff
     """
     try:
-        installment = Installment.objects.select_related('payment_plan').get(id=installment_id)
-        
-        # Calculate days until due if not provided
-        if days_until_due is None:
-            days_until_due = (installment.due_date - date.today()).days
-        
-        # Skip if installment is already paid or cancelled
-        if installment.status in ['paid', 'cancelled']:
-            logger.info(f"Skipping reminder for installment {installment_id} - status: {installment.status}")
-            return f"Skipped - installment {installment_id} is {installment.status}"
-        
-        # Determine reminder type based on days until due
-        if days_until_due > 0:
-            reminder_type = "upcoming"
-            subject = f"Payment Reminder: Installment Due in {days_until_due} Days"
-            urgency = "upcoming"
-        elif days_until_due == 0:
-            reminder_type = "due_today"
-            subject = "Payment Reminder: Installment Due Today"
-            urgency = "due"
-        else:
-            reminder_type = "overdue"
-            days_overdue = abs(days_until_due)
-            subject = f"Overdue Payment: Installment {days_overdue} Days Late"
-            urgency = "overdue"
-        
-        # Create mock email content
-        message = create_payment_reminder_message(installment, days_until_due, reminder_type)
-        
-        # Mock email sending (log instead of actual email)
-        mock_send_email(
-            to_email=installment.payment_plan.user_email,
-            subject=subject,
-            message=message,
-            installment=installment,
-            reminder_type=reminder_type
-        )
-        
-        # Log the reminder
-        logger.info(
-            f"Payment reminder sent for installment {installment_id} "
-            f"({reminder_type}, {days_until_due} days, {urgency})"
-        )
-        
-        return {
-            'installment_id': installment_id,
-            'reminder_type': reminder_type,
-            'days_until_due': days_until_due,
-            'status': 'sent',
-            'recipient': installment.payment_plan.user_email
-        }
+        # One joined query with just the columns the reminder email uses
+        installment = Installment.objects.select_related('payment_plan').only(
+            *REMINDER_FIELDS
+        ).get(id=installment_id)
         
     except Installment.DoesNotExist:
         error_msg = f"Installment {installment_id} not found"
         logger.error(error_msg)
         return {'error': error_msg}
     
-    except Exception as e:
-        error_msg = f"Failed to send reminder for installment {installment_id}: {str(e)}"
-        logger.error(error_msg)
-        
-        # Retry logic
-        if self.request.retries < self.max_retries:
-            logger.info(f"Retrying reminder for installment {installment_id} (attempt {self.request.retries + 1})")
-            raise self.retry(countdown=60 * (self.request.retries + 1))  # Exponential backoff
-        
-        return {'error': error_msg, 'installment_id': installment_id}
+    return deliver_payment_reminder(installment, days_until_due)
+
+# Reminder subjects repeat for the same few day counts across a batch
+@lru_cache(maxsize=64)
+def _upcoming_subject(days_until_due):
+    return f"Payment Reminder: Installment Due in {days_until_due} Days"
+
+@lru_cache(maxsize=64)
+def _overdue_subject(days_overdue):
+    return f"Overdue Payment: Installment {days_overdue} Days Late"
+
+def deliver_payment_reminder(installment, days_until_due=None):
+    """
+    Build and send the reminder email for an installment loaded with REMINDER_FIELDS
+    """
+    # Calculate days until due if not provided
+    if days_until_due is None:
+        days_until_due = (installment.due_date - date.today()).days
+    
+    # Skip if installment is already paid or cancelled
+    if installment.status in CLOSED_STATUSES:
+        logger.info(f"Skipping reminder for installment {installment.id} - status: {installment.status}")
+        return f"Skipped - installment {installment.id} is {installment.status}"
+    
+    # Determine reminder type based on days until due
+    if days_until_due > 0:
+        reminder_type = "upcoming"
+        subject = _upcoming_subject(days_until_due)
+        urgency = "upcoming"
+    elif days_until_due == 0:
+        reminder_type = "due_today"
+        subject = "Payment Reminder: Installment Due Today"
+        urgency = "due"
+    else:
+        reminder_type = "overdue"
+        days_overdue = abs(days_until_due)
+        subject = _overdue_subject(days_overdue)
+        urgency = "overdue"
+    
+    # Create mock email content
+    message = create_payment_reminder_message(installment, days_until_due, reminder_type)
+    
+    # Mock email sending (log instead of actual email)
+    mock_send_email(
+        to_email=installment.payment_plan.user_email,
+        subject=subject,
+        message=message,
+        installment=installment,
+        reminder_type=reminder_type
+    )
+    
+    # Log the reminder
+    logger.info(
+        f"Payment reminder sent for installment {installment.id} "
+        f"({reminder_type}, {days_until_due} days, {urgency})"
+    )
+    
+    return {
+        'installment_id': installment.id,
+        'reminder_type': reminder_type,
+        'days_until_due': days_until_due,
+        'status': 'sent',
+        'recipient': installment.payment_plan.user_email
+    }
+
+@shared_task(ignore_result=True, acks_late=True)
+def send_payment_reminder_batch(reminders):
+    """
+    Send payment reminders for a batch of (installment_id, days_until_due) pairs
+    Loads every installment in the batch with one query
+    """
+    days_by_id = {installment_id: days_until_due for installment_id, days_until_due in reminders}
+    installments = Installment.objects.select_related('payment_plan').only(
+        *REMINDER_FIELDS
+    ).filter(id__in=list(days_by_id))
+    
+    sent_count = 0
+    for installment in installments:
+        days_until_due = days_by_id.pop(installment.id)
+        try:
+            result = deliver_payment_reminder(installment, days_until_due)
+            if isinstance(result, dict):
+                sent_count += 1
+        except Exception as e:
+            # Hand the failure to the single-reminder task, which retries with backoff
+            logger.error(f"Failed to send reminder for installment {installment.id}: {str(e)}")
+            send_payment_reminder.apply_async(
+                args=[installment.id, days_until_due], ignore_result=True
+            )
+    
+    for installment_id in days_by_id:
+        logger.error(f"Installment {installment_id} not found")
+    
+    logger.info(f"Reminder batch processed: {sent_count} of {len(reminders)} reminders sent")
+    return sent_count
 
 @shared_task
 def send_bulk_payment_reminders(days_ahead=3):
@@ -94,8 +174,8 @@ def send_bulk_payment_reminders(days_ahead=3):
         # Find installments due on the target date
         upcoming_installments = Installment.objects.filter(
             due_date=target_date,
-            status__in=['pending', 'late']
-        ).select_related('payment_plan')
+            status__in=REMINDER_STATUSES
+        )
         
         reminder_count = upcoming_installments.count()
         
@@ -110,17 +190,23 @@ def send_bulk_payment_reminders(days_ahead=3):
         
         logger.info(f"Sending {reminder_count} payment reminders for installments due on {target_date}")
         
-        # Send individual reminders asynchronously
-        sent_tasks = []
-        for installment in upcoming_installments:
-            task = send_payment_reminder.delay(installment.id, days_ahead)
-            sent_tasks.append(task.id)
+        # Stream installment ids and queue reminders in batches
+        installment_ids = upcoming_installments.order_by('id').values_list(
+            'id', flat=True
+        ).iterator(chunk_size=REMINDER_QUERY_CHUNK_SIZE)
+        result = group(
+            send_payment_reminder_batch.s(batch)
+            for batch in _batched(
+                ((installment_id, days_ahead) for installment_id in installment_ids),
+                REMINDER_TASK_CHUNK_SIZE
+            )
+        ).apply_async()
         
         return {
             'days_ahead': days_ahead,
             'target_date': str(target_date),
             'reminders_sent': reminder_count,
-            'task_ids': sent_tasks,
+            'group_id': result.id,
             'message': f'Sent {reminder_count} payment reminders'
         }
         
@@ -140,10 +226,11 @@ def send_overdue_payment_reminders():
         logger.info(f"Marked {marked_late} installments as late")
         
         # Find overdue installments (now marked as late)
+        today = date.today()
         overdue_installments = Installment.objects.filter(
             status='late',
-            due_date__lt=date.today()
-        ).select_related('payment_plan')
+            due_date__lt=today
+        )
         
         overdue_count = overdue_installments.count()
         
@@ -156,17 +243,22 @@ def send_overdue_payment_reminders():
         
         logger.info(f"Sending {overdue_count} overdue payment reminders")
         
-        # Send overdue reminders
-        sent_tasks = []
-        for installment in overdue_installments:
-            days_overdue = (date.today() - installment.due_date).days
-            task = send_payment_reminder.delay(installment.id, -days_overdue)
-            sent_tasks.append(task.id)
+        # Stream ids with due dates and queue overdue reminders in batches
+        overdue_rows = overdue_installments.order_by('id').values_list(
+            'id', 'due_date'
+        ).iterator(chunk_size=REMINDER_QUERY_CHUNK_SIZE)
+        result = group(
+            send_payment_reminder_batch.s(batch)
+            for batch in _batched(
+                ((installment_id, (due_date - today).days) for installment_id, due_date in overdue_rows),
+                REMINDER_TASK_CHUNK_SIZE
+            )
+        ).apply_async()
         
         return {
             'marked_late': marked_late,
             'overdue_reminders_sent': overdue_count,
-            'task_ids': sent_tasks,
+            'group_id': result.id,
             'message': f'Sent {overdue_count} overdue reminders'
         }
         
@@ -182,34 +274,19 @@ def daily_payment_reminders():
     Combines upcoming and overdue reminders
     """
     try:
-        results = {}
-        
-        # Send 3-day advance reminders
-        results['3_day_reminders'] = send_bulk_payment_reminders.delay(3).get()
-        
-        # Send 1-day advance reminders
-        results['1_day_reminders'] = send_bulk_payment_reminders.delay(1).get()
-        
-        # Send due today reminders
-        results['due_today_reminders'] = send_bulk_payment_reminders.delay(0).get()
-        
-        # Send overdue reminders
-        results['overdue_reminders'] = send_overdue_payment_reminders.delay().get()
-        
-        # Calculate totals
-        total_sent = sum([
-            results['3_day_reminders'].get('reminders_sent', 0),
-            results['1_day_reminders'].get('reminders_sent', 0),
-            results['due_today_reminders'].get('reminders_sent', 0),
-            results['overdue_reminders'].get('overdue_reminders_sent', 0)
-        ])
-        
-        logger.info(f"Daily payment reminders completed: {total_sent} total reminders sent")
+        # Run the 3-day, 1-day, due today and overdue batches in parallel and
+        # total them in a chord callback, so no worker slot blocks on the batches
+        result = chord(group(
+            send_bulk_payment_reminders.s(3),
+            send_bulk_payment_reminders.s(1),
+            send_bulk_payment_reminders.s(0),
+            send_overdue_payment_reminders.s()
+        ))(summarize_daily_payment_reminders.s())
         
         return {
-            'total_reminders_sent': total_sent,
+            'chord_id': result.id,
             'execution_date': str(date.today()),
-            'details': results
+            'message': 'Daily payment reminder batches queued'
         }
         
     except Exception as e:
@@ -217,37 +294,72 @@ def daily_payment_reminders():
         logger.error(error_msg)
         return {'error': error_msg}
 
+@shared_task
+def summarize_daily_payment_reminders(batch_results):
+    """
+    Total the 3-day, 1-day, due today and overdue reminder batch results
+    """
+    three_day, one_day, due_today, overdue = batch_results
+    results = {
+        '3_day_reminders': three_day,
+        '1_day_reminders': one_day,
+        'due_today_reminders': due_today,
+        'overdue_reminders': overdue
+    }
+    
+    # Calculate totals
+    total_sent = sum([
+        results['3_day_reminders'].get('reminders_sent', 0),
+        results['1_day_reminders'].get('reminders_sent', 0),
+        results['due_today_reminders'].get('reminders_sent', 0),
+        results['overdue_reminders'].get('overdue_reminders_sent', 0)
+    ])
+    
+    logger.info(f"Daily payment reminders completed: {total_sent} total reminders sent")
+    
+    return {
+        'total_reminders_sent': total_sent,
+        'execution_date': str(date.today()),
+        'details': results
+    }
+
 @shared_task
 def generate_merchant_payment_report(merchant_id):
     """
     Generate payment status report for a specific merchant
     """
     try:
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
         merchant = User.objects.get(id=merchant_id, user_type='merchant')
         
-        # Get merchant's payment plans
-        payment_plans = PaymentPlan.objects.filter(merchant=merchant)
+        # Payment plan metrics in a single query
+        plan_stats = PaymentPlan.objects.filter(merchant=merchant).aggregate(
+            total_plans=Count('id'),
+            active_plans=Count('id', filter=Q(status='active')),
+            completed_plans=Count('id', filter=Q(status='completed')),
+            total_revenue=Sum('total_amount')
+        )
         
-        # Calculate statistics
-        total_plans = payment_plans.count()
-        active_plans = payment_plans.filter(status='active').count()
-        completed_plans = payment_plans.filter(status='completed').count()
+        # Installment metrics in a single query
+        installment_stats = Installment.objects.filter(payment_plan__merchant=merchant).aggregate(
+            total_installments=Count('id'),
+            paid_installments=Count('id', filter=Q(status='paid')),
+            pending_installments=Count('id', filter=Q(status='pending')),
+            late_installments=Count('id', filter=Q(status='late')),
+            collected_amount=Sum('amount', filter=Q(status='paid'))
+        )
         
-        # Get installment statistics
-        total_installments = Installment.objects.filter(payment_plan__merchant=merchant).count()
-        paid_installments = Installment.objects.filter(payment_plan__merchant=merchant, status='paid').count()
-        pending_installments = Installment.objects.filter(payment_plan__merchant=merchant, status='pending').count()
-        late_installments = Installment.objects.filter(payment_plan__merchant=merchant, status='late').count()
+        total_plans = plan_stats['total_plans']
+        active_plans = plan_stats['active_plans']
+        completed_plans = plan_stats['completed_plans']
+        
+        total_installments = installment_stats['total_installments']
+        paid_installments = installment_stats['paid_installments']
+        pending_installments = installment_stats['pending_installments']
+        late_installments = installment_stats['late_installments']
         
         # Calculate financial metrics
-        total_revenue = sum(plan.total_amount for plan in payment_plans)
-        collected_amount = sum(
-            installment.amount for installment in 
-            Installment.objects.filter(payment_plan__merchant=merchant, status='paid')
-        )
+        total_revenue = plan_stats['total_revenue'] or 0
+        collected_amount = installment_stats['collected_amount'] or 0
         outstanding_amount = total_revenue - collected_amount
         
         report = {
@@ -285,82 +397,88 @@ def generate_merchant_payment_report(merchant_id):
         logger.error(error_msg)
         return {'error': error_msg, 'merchant_id': merchant_id}
 
-def create_payment_reminder_message(installment, days_until_due, reminder_type):
-    """
-    Create the payment reminder message content
-    """
-    payment_plan = installment.payment_plan
-    
-    if reminder_type == "upcoming":
-        message = f"""
-Dear Customer,
+# Reminder email bodies keyed by reminder type, filled in by create_payment_reminder_message
+PAYMENT_REMINDER_TEMPLATES = {
+    'upcoming': """Dear Customer,
 
 This is a friendly reminder that your installment payment is due in {days_until_due} days.
 
 Payment Details:
-- Installment Number: {installment.installment_number} of {payment_plan.number_of_installments}
-- Amount Due: {installment.amount} SAR
-- Due Date: {installment.due_date}
-- Payment Plan ID: {payment_plan.id}
+- Installment Number: {installment_number} of {number_of_installments}
+- Amount Due: {amount} SAR
+- Due Date: {due_date}
+- Payment Plan ID: {payment_plan_id}
 
 Please ensure your payment is completed by the due date to avoid any late fees.
 
 Thank you for your business!
 
-BNPL Payment System
-        """
-    elif reminder_type == "due_today":
-        message = f"""
-Dear Customer,
+BNPL Payment System""",
+    'due_today': """Dear Customer,
 
 Your installment payment is due TODAY.
 
 Payment Details:
-- Installment Number: {installment.installment_number} of {payment_plan.number_of_installments}
-- Amount Due: {installment.amount} SAR
-- Due Date: {installment.due_date} (TODAY)
-- Payment Plan ID: {payment_plan.id}
+- Installment Number: {installment_number} of {number_of_installments}
+- Amount Due: {amount} SAR
+- Due Date: {due_date} (TODAY)
+- Payment Plan ID: {payment_plan_id}
 
 Please complete your payment today to avoid late fees.
 
-BNPL Payment System
-        """
-    else:  # overdue
-        days_overdue = abs(days_until_due)
-        message = f"""
-Dear Customer,
+BNPL Payment System""",
+    'overdue': """Dear Customer,
 
 Your installment payment is now {days_overdue} days overdue.
 
 Payment Details:
-- Installment Number: {installment.installment_number} of {payment_plan.number_of_installments}
-- Amount Due: {installment.amount} SAR
-- Original Due Date: {installment.due_date}
+- Installment Number: {installment_number} of {number_of_installments}
+- Amount Due: {amount} SAR
+- Original Due Date: {due_date}
 - Days Overdue: {days_overdue}
-- Payment Plan ID: {payment_plan.id}
+- Payment Plan ID: {payment_plan_id}
 
 Please complete your payment immediately to avoid further complications.
 
-BNPL Payment System
-        """
+BNPL Payment System""",
+}
+
+def create_payment_reminder_message(installment, days_until_due, reminder_type):
+    """
+    Create the payment reminder message content
+    """
+    payment_plan = installment.payment_plan
+    template = PAYMENT_REMINDER_TEMPLATES.get(reminder_type, PAYMENT_REMINDER_TEMPLATES['overdue'])
     
-    return message.strip()
+    return template.format(
+        days_until_due=days_until_due,
+        days_overdue=abs(days_until_due),
+        installment_number=installment.installment_number,
+        number_of_installments=payment_plan.number_of_installments,
+        amount=installment.amount,
+        due_date=installment.due_date,
+        payment_plan_id=payment_plan.id
+    )
 
 def mock_send_email(to_email, subject, message, installment, reminder_type):
     """
     Mock email sending function that logs instead of sending actual emails
     """
-    print(f"\n📧 MOCK EMAIL SENT")
-    print(f"To: {to_email}")
-    print(f"Subject: {subject}")
-    print(f"Type: {reminder_type}")
-    print(f"Installment: {installment.id}")
-    print(f"Amount: {installment.amount} SAR")
-    print("-" * 50)
-    print(message)
-    print("=" * 50)
+    # Full email body is only rendered when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('\n'.join((
+            "📧 MOCK EMAIL SENT",
+            f"To: {to_email}",
+            f"Subject: {subject}",
+            f"Type: {reminder_type}",
+            f"Installment: {installment.id}",
+            f"Amount: {installment.amount} SAR",
+            "-" * 50,
+            message,
+            "=" * 50,
+        )))
     
-    # Log to Django logger as well
+    # One-line summary at info level
     logger.info(
         f"Mock email sent - To: {to_email}, Subject: {subject}, "
         f"Installment: {installment.id}, Type: {reminder_type}"
@@ -370,11 +488,14 @@ def mock_send_report(merchant_email, report):
     """
     Mock report delivery function
     """
-    print(f"\n📊 MOCK REPORT DELIVERED")
-    print(f"To: {merchant_email}")
-    print(f"Report Date: {report['report_date']}")
-    print(f"Payment Plans: {report['payment_plans']['total']}")
-    print(f"Collection Rate: {report['financials']['collection_rate']:.2f}%")
-    print("=" * 50)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('\n'.join((
+            "📊 MOCK REPORT DELIVERED",
+            f"To: {merchant_email}",
+            f"Report Date: {report['report_date']}",
+            f"Payment Plans: {report['payment_plans']['total']}",
+            f"Collection Rate: {report['financials']['collection_rate']:.2f}%",
+            "=" * 50,
+        )))
     
     logger.info(f"Mock report delivered to {merchant_email}")
\ No newline at end of file
@@ -7,9 +7,13 @@ be used across different test suites.
 """
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
 from django.utils import timezone
 from decimal import Decimal
 from datetime import date, timedelta
+from functools import lru_cache
 from typing import Dict, List, Optional
 import logging
 
@@ -19,6 +23,17 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def hash_test_password(raw_password: str) -> str:
+    """
+    Hash a test password once and reuse it for every seeded user
+    
+    Password hashing is deliberately slow and dominates user creation cost,
+    so seeded users with the same password share one hash
+    """
+    return make_password(raw_password)
+
+
 class TestDataSeeder:
     """
     Comprehensive test data seeder for payment app tests.
@@ -35,13 +50,64 @@ class TestDataSeeder:
         self.created_users = []
         self.created_payment_plans = []
         self.created_installments = []
+        # Created users bucketed by user_type, kept in step with created_users
+        self._users_by_type = {}
+        # Primary keys for cleanup_all, filled in as objects are created. Rows
+        # owned by a seeded user are removed by CASCADE; only the ones hanging
+        # off objects created elsewhere are tracked for an explicit DELETE
+        self._created_user_ids = set()
+        self._created_plan_ids = set()
+        self._orphan_plan_ids = set()
+        self._orphan_installment_ids = set()
         self._seed_counter = 0
     
+    def _next_installment_number(self, payment_plan: PaymentPlan) -> int:
+        """Return the number after the plan's highest installment number"""
+        # Read from the database each time so installments created outside the
+        # seeder are counted too
+        highest = payment_plan.installments.aggregate(
+            highest=Max('installment_number')
+        )['highest']
+        return (highest or 0) + 1
+    
+    def track_user(self, user: User):
+        """Record a user created outside the seeder so cleanup_all removes it"""
+        self.created_users.append(user)
+        self._created_user_ids.add(user.pk)
+        self._users_by_type.setdefault(user.user_type, []).append(user)
+    
     def get_unique_identifier(self) -> str:
         """Get a unique identifier for test data"""
         self._seed_counter += 1
         return f"test_{self._seed_counter}_{timezone.now().strftime('%H%M%S')}"
     
+    def _user_defaults(self, user_type: str, **kwargs) -> Dict:
+        """Default fields for a seeded user of the given type"""
+        unique_id = self.get_unique_identifier()
+        defaults = {
+            'username': f'{user_type}_{unique_id}',
+            'email': f'{user_type}_{unique_id}@test.com',
+            'password': 'testpass123',
+            'user_type': user_type,
+            'first_name': 'Test',
+            'last_name': user_type.capitalize()
+        }
+        defaults.update(kwargs)
+        return defaults
+    
+    def _build_user(self, defaults: Dict) -> User:
+        """
+        Build an unsaved user equivalent to UserManager.create_user output,
+        hashing its password through the shared cache
+        """
+        password = defaults.pop('password')
+        # Same normalization create_user applies before saving
+        defaults['username'] = User.normalize_username(defaults['username'])
+        defaults['email'] = User.objects.normalize_email(defaults.get('email'))
+        user = User(**defaults)
+        user.password = hash_test_password(password)
+        return user
+    
     def create_merchant(self, **kwargs) -> User:
         """
         Create a merchant user for testing
@@ -52,19 +118,9 @@ class TestDataSeeder:
         Returns:
             User: Created merchant user
         """
-        unique_id = self.get_unique_identifier()
-        defaults = {
-            'username': f'merchant_{unique_id}',
-            'email': f'merchant_{unique_id}@test.com',
-            'password': 'testpass123',
-            'user_type': 'merchant',
-            'first_name': 'Test',
-            'last_name': 'Merchant'
-        }
-        defaults.update(kwargs)
-        
-        user = User.objects.create_user(**defaults)
-        self.created_users.append(user)
+        user = self._build_user(self._user_defaults('merchant', **kwargs))
+        user.save()
+        self.track_user(user)
         logger.debug(f"Created merchant user: {user.username}")
         return user
     
@@ -78,22 +134,34 @@ class TestDataSeeder:
         Returns:
             User: Created customer user
         """
-        unique_id = self.get_unique_identifier()
-        defaults = {
-            'username': f'customer_{unique_id}',
-            'email': f'customer_{unique_id}@test.com',
-            'password': 'testpass123',
-            'user_type': 'customer',
-            'first_name': 'Test',
-            'last_name': 'Customer'
-        }
-        defaults.update(kwargs)
-        
-        user = User.objects.create_user(**defaults)
-        self.created_users.append(user)
+        user = self._build_user(self._user_defaults('customer', **kwargs))
+        user.save()
+        self.track_user(user)
         logger.debug(f"Created customer user: {user.username}")
         return user
     
+    def create_users_bulk(self, user_specs: List[Dict]) -> List[User]:
+        """
+        Create several merchants and customers with a single INSERT
+        
+        Args:
+            user_specs: One dict per user with a 'user_type' of 'merchant' or
+                'customer' plus any fields to override defaults
+            
+        Returns:
+            List[User]: Created users, in the order of user_specs
+        """
+        users = [
+            self._build_user(self._user_defaults(**spec))
+            for spec in user_specs
+        ]
+        
+        created = User.objects.bulk_create(users)
+        for user in created:
+            self.track_user(user)
+        logger.debug(f"Created {len(created)} users")
+        return created
+    
     def create_payment_plan(self, merchant: User, customer_email: str = None, **kwargs) -> PaymentPlan:
         """
         Create a payment plan for testing
@@ -123,6 +191,9 @@ class TestDataSeeder:
         
         payment_plan = PaymentPlan.objects.create(**defaults)
         self.created_payment_plans.append(payment_plan)
+        self._created_plan_ids.add(payment_plan.pk)
+        if payment_plan.merchant_id not in self._created_user_ids:
+            self._orphan_plan_ids.add(payment_plan.pk)
         logger.debug(f"Created payment plan: {payment_plan.id}")
         return payment_plan
     
@@ -137,7 +208,11 @@ class TestDataSeeder:
         Returns:
             Installment: Created installment
         """
-        installment_count = payment_plan.installments.count() + 1
+        # Only look up the next number when the caller did not pick one
+        if 'installment_number' in kwargs:
+            installment_count = kwargs['installment_number']
+        else:
+            installment_count = self._next_installment_number(payment_plan)
         
         defaults = {
             'payment_plan': payment_plan,
@@ -152,9 +227,50 @@ class TestDataSeeder:
         
         installment = Installment.objects.create(**defaults)
         self.created_installments.append(installment)
+        if payment_plan.pk not in self._created_plan_ids:
+            self._orphan_installment_ids.add(installment.pk)
         logger.debug(f"Created installment: {installment.id}")
         return installment
     
+    def create_installments_bulk(self, payment_plan: PaymentPlan, count: int, **kwargs) -> List[Installment]:
+        """
+        Create several installments for a payment plan with a single INSERT
+        
+        bulk_create does not send post_save, so only use this where the test
+        does not rely on installment signals (plan status or overdue marking)
+        
+        Args:
+            payment_plan: Payment plan the installments belong to
+            count: Number of installments to create
+            **kwargs: Additional installment fields applied to every installment
+            
+        Returns:
+            List[Installment]: Created installments
+        """
+        first_number = self._next_installment_number(payment_plan)
+        today = date.today()
+        
+        installments = []
+        for installment_number in range(first_number, first_number + count):
+            defaults = {
+                'payment_plan': payment_plan,
+                'installment_number': installment_number,
+                'amount': Decimal('333.33'),
+                'principal_component': Decimal('320.00'),
+                'interest_component': Decimal('13.33'),
+                'due_date': today + timedelta(days=30 * installment_number),
+                'status': 'pending'
+            }
+            defaults.update(kwargs)
+            installments.append(Installment(**defaults))
+        
+        created = Installment.objects.bulk_create(installments, batch_size=500)
+        self.created_installments.extend(created)
+        if payment_plan.pk not in self._created_plan_ids:
+            self._orphan_installment_ids.update(installment.pk for installment in created)
+        logger.debug(f"Created {len(created)} installments for payment plan: {payment_plan.id}")
+        return created
+    
     def create_test_scenario(self, scenario_name: str) -> Dict:
         """
         Create predefined test scenarios with multiple related objects
@@ -178,6 +294,7 @@ class TestDataSeeder:
         
         return scenarios[scenario_name]()
     
+    @transaction.atomic
     def _create_basic_merchant_customer_scenario(self) -> Dict:
         """Create basic merchant-customer scenario"""
         merchant = self.create_merchant()
@@ -199,6 +316,7 @@ class TestDataSeeder:
             'installments': installments
         }
     
+    @transaction.atomic
     def _create_multiple_merchants_scenario(self) -> Dict:
         """Create scenario with multiple merchants and customers"""
         merchant1 = self.create_merchant(username='merchant_1', email='merchant1@test.com')
@@ -234,6 +352,7 @@ class TestDataSeeder:
             'plan2': plan2
         }
     
+    @transaction.atomic
     def _create_payment_workflow_scenario(self) -> Dict:
         """Create scenario for testing payment workflows"""
         merchant = self.create_merchant()
@@ -276,28 +395,18 @@ class TestDataSeeder:
             'all_installments': [pending_installment, late_installment, paid_installment]
         }
     
+    @transaction.atomic
     def _create_edge_cases_scenario(self) -> Dict:
         """Create scenario for testing edge cases"""
-        # User with invalid user_type
-        invalid_user = User.objects.create_user(
-            username='invalid_user',
-            email='invalid@test.com',
-            password='testpass123',
-            user_type='invalid'
-        )
-        self.created_users.append(invalid_user)
-        
-        # Customer without email
-        no_email_customer = User.objects.create_user(
-            username='no_email_customer',
-            email='',
-            password='testpass123',
-            user_type='customer'
-        )
-        self.created_users.append(no_email_customer)
-        
-        # Merchant for cancelled plan
-        merchant = self.create_merchant()
+        # User with invalid user_type, customer without email and a merchant
+        # for the cancelled plan
+        invalid_user, no_email_customer, merchant = self.create_users_bulk([
+            {'user_type': 'invalid', 'username': 'invalid_user', 'email': 'invalid@test.com',
+             'first_name': '', 'last_name': ''},
+            {'user_type': 'customer', 'username': 'no_email_customer', 'email': '',
+             'first_name': '', 'last_name': ''},
+            {'user_type': 'merchant'},
+        ])
         
         # Cancelled payment plan
         cancelled_plan = self.create_payment_plan(
@@ -320,6 +429,7 @@ class TestDataSeeder:
             'cancelled_installment': cancelled_installment
         }
     
+    @transaction.atomic
     def _create_cross_user_isolation_scenario(self) -> Dict:
         """Create scenario for testing cross-user isolation"""
         # Create multiple merchants and customers
@@ -335,9 +445,8 @@ class TestDataSeeder:
             )
             plans.append(plan)
             
-            # Create some installments
-            for j in range(2):
-                self.create_installment(plan)
+            # Create some pending installments; no signal side effects are needed
+            self.create_installments_bulk(plan, 2)
         
         return {
             'merchants': merchants,
@@ -353,30 +462,30 @@ class TestDataSeeder:
         It's designed to be called in test tearDown methods.
         """
         try:
-            # Delete in reverse order of creation to handle foreign key constraints
-            
-            # Delete installments first
-            if self.created_installments:
-                installment_ids = [inst.id for inst in self.created_installments if inst.id]
-                deleted_installments = Installment.objects.filter(id__in=installment_ids).delete()
-                logger.debug(f"Deleted {deleted_installments[0]} installments")
-            
-            # Delete payment plans
-            if self.created_payment_plans:
-                plan_ids = [plan.id for plan in self.created_payment_plans if plan.id]
-                deleted_plans = PaymentPlan.objects.filter(id__in=plan_ids).delete()
-                logger.debug(f"Deleted {deleted_plans[0]} payment plans")
-            
-            # Delete users
-            if self.created_users:
-                user_ids = [user.id for user in self.created_users if user.id]
-                deleted_users = User.objects.filter(id__in=user_ids).delete()
-                logger.debug(f"Deleted {deleted_users[0]} users")
+            with transaction.atomic():
+                if self._orphan_installment_ids:
+                    deleted_installments = Installment.objects.filter(
+                        id__in=self._orphan_installment_ids
+                    ).delete()
+                    logger.debug(f"Deleted {deleted_installments[0]} installments")
+                
+                if self._orphan_plan_ids:
+                    deleted_plans = PaymentPlan.objects.filter(id__in=self._orphan_plan_ids).delete()
+                    logger.debug(f"Deleted {deleted_plans[0]} payment plans")
+                
+                if self._created_user_ids:
+                    deleted_users = User.objects.filter(id__in=self._created_user_ids).delete()
+                    logger.debug(f"Deleted {deleted_users[0]} users and related objects")
             
             # Clear tracking lists
             self.created_installments.clear()
             self.created_payment_plans.clear()
             self.created_users.clear()
+            self._users_by_type.clear()
+            self._created_user_ids.clear()
+            self._created_plan_ids.clear()
+            self._orphan_plan_ids.clear()
+            self._orphan_installment_ids.clear()
             self._seed_counter = 0
             
             logger.info("Test data cleanup completed successfully")
@@ -392,14 +501,23 @@ class TestDataSeeder:
         Returns:
             Dict: Summary of created objects
         """
+        # Plan status can change after creation, so plans are split in one pass here
+        active_plans = []
+        cancelled_plans = []
+        for plan in self.created_payment_plans:
+            if plan.status == 'active':
+                active_plans.append(plan)
+            elif plan.status == 'cancelled':
+                cancelled_plans.append(plan)
+        
         return {
             'users_created': len(self.created_users),
             'payment_plans_created': len(self.created_payment_plans),
             'installments_created': len(self.created_installments),
-            'merchants': [u for u in self.created_users if u.user_type == 'merchant'],
-            'customers': [u for u in self.created_users if u.user_type == 'customer'],
-            'active_plans': [p for p in self.created_payment_plans if p.status == 'active'],
-            'cancelled_plans': [p for p in self.created_payment_plans if p.status == 'cancelled']
+            'merchants': list(self._users_by_type.get('merchant', ())),
+            'customers': list(self._users_by_type.get('customer', ())),
+            'active_plans': active_plans,
+            'cancelled_plans': cancelled_plans
         }
 
 
@@ -27,12 +27,21 @@ class PaymentTestFixtures:
     """
     
     def __init__(self):
-        self.seeder = TestDataSeeder()
+        self._seeder = None
         self._fixtures_cache = {}
+        # Signed access tokens per user pk, reused across requests in a test
+        self._token_cache: Dict[int, str] = {}
+    
+    @property
+    def seeder(self) -> TestDataSeeder:
+        """Seeder used for fixture data, created on first use"""
+        if self._seeder is None:
+            self._seeder = TestDataSeeder()
+        return self._seeder
     
     def get_jwt_token(self, user: User) -> str:
         """
-        Get JWT token for a user
+        Get JWT token for a user, signing it only once per user
         
         Args:
             user: User to generate token for
@@ -40,8 +49,10 @@ class PaymentTestFixtures:
         Returns:
             str: JWT access token
         """
-        refresh = RefreshToken.for_user(user)
-        return str(refresh.access_token)
+        if user.pk not in self._token_cache:
+            refresh = RefreshToken.for_user(user)
+            self._token_cache[user.pk] = str(refresh.access_token)
+        return self._token_cache[user.pk]
     
     def get_auth_headers(self, user: User) -> Dict[str, str]:
         """
@@ -154,18 +165,24 @@ class PaymentTestFixtures:
         """Create a custom payment plan with specified attributes"""
         return self.seeder.create_payment_plan(merchant=merchant, **kwargs)
     
-    def create_test_installments(self, payment_plan: Any, count: int = 3, **kwargs) -> list:
+    def create_test_installments(self, payment_plan: Any, count: int = 3, bulk: bool = False, **kwargs) -> list:
         """
         Create multiple test installments for a payment plan
         
         Args:
             payment_plan: Payment plan to create installments for
             count: Number of installments to create
+            bulk: Create them with one INSERT instead; installment signals are
+                not sent and installment_number/due_date follow the plan's
+                existing installments, so pass the status you want directly
             **kwargs: Additional installment attributes
             
         Returns:
             List of created installments
         """
+        if bulk:
+            return self.seeder.create_installments_bulk(payment_plan, count, **kwargs)
+        
         installments = []
         for i in range(count):
             installment_kwargs = kwargs.copy()
@@ -179,8 +196,10 @@ class PaymentTestFixtures:
     
     def cleanup(self):
         """Clean up all fixture data"""
-        self.seeder.cleanup_all()
+        if self._seeder is not None:
+            self._seeder.cleanup_all()
         self._fixtures_cache.clear()
+        self._token_cache.clear()
 
 
 # Pre-configured test data sets for common scenarios
@@ -199,25 +218,13 @@ class CommonTestScenarios:
         """
         seeder = TestDataSeeder()
         
-        # Create primary test users
-        merchant = seeder.create_merchant(
-            username='primary_merchant',
-            email='primary_merchant@test.com'
-        )
-        customer = seeder.create_customer(
-            username='primary_customer', 
-            email='primary_customer@test.com'
-        )
-        
-        # Create other users for isolation testing
-        other_merchant = seeder.create_merchant(
-            username='other_merchant',
-            email='other_merchant@test.com'
-        )
-        other_customer = seeder.create_customer(
-            username='other_customer',
-            email='other_customer@test.com'
-        )
+        # Create primary test users and other users for isolation testing
+        merchant, customer, other_merchant, other_customer = seeder.create_users_bulk([
+            {'user_type': 'merchant', 'username': 'primary_merchant', 'email': 'primary_merchant@test.com'},
+            {'user_type': 'customer', 'username': 'primary_customer', 'email': 'primary_customer@test.com'},
+            {'user_type': 'merchant', 'username': 'other_merchant', 'email': 'other_merchant@test.com'},
+            {'user_type': 'customer', 'username': 'other_customer', 'email': 'other_customer@test.com'},
+        ])
         
         # Create payment plans
         primary_plan = seeder.create_payment_plan(
@@ -234,24 +241,9 @@ class CommonTestScenarios:
             number_of_installments=2
         )
         
-        # Create installments
-        primary_installments = []
-        for i in range(3):
-            installment = seeder.create_installment(
-                primary_plan,
-                installment_number=i + 1,
-                status='pending'
-            )
-            primary_installments.append(installment)
-        
-        other_installments = []
-        for i in range(2):
-            installment = seeder.create_installment(
-                other_plan,
-                installment_number=i + 1,
-                status='pending'
-            )
-            other_installments.append(installment)
+        # Create installments; future pending rows need no signal handling
+        primary_installments = seeder.create_installments_bulk(primary_plan, 3, status='pending')
+        other_installments = seeder.create_installments_bulk(other_plan, 2, status='pending')
         
         return {
             'seeder': seeder,
@@ -287,6 +279,8 @@ class CommonTestScenarios:
         )
         
         # Create installments in various states
+        today = date.today()
+        now = timezone.now()
         pending_installment = seeder.create_installment(
             active_plan,
             installment_number=1,
@@ -297,21 +291,21 @@ class CommonTestScenarios:
             active_plan,
             installment_number=2,
             status='late',
-            due_date=date.today() - timedelta(days=5)
+            due_date=today - timedelta(days=5)
         )
         
         paid_installment = seeder.create_installment(
             active_plan,
             installment_number=3,
             status='paid',
-            paid_date=timezone.now()
+            paid_date=now
         )
         
         future_installment = seeder.create_installment(
             active_plan,
             installment_number=4,
             status='pending',
-            due_date=date.today() + timedelta(days=60)
+            due_date=today + timedelta(days=60)
         )
         
         # Completed payment plan
@@ -322,14 +316,13 @@ class CommonTestScenarios:
             status='completed'
         )
         
-        # All installments paid
-        for i in range(2):
-            seeder.create_installment(
-                completed_plan,
-                installment_number=i + 1,
-                status='paid',
-                paid_date=timezone.now()
-            )
+        # All installments paid; the plan is already created as completed
+        seeder.create_installments_bulk(
+            completed_plan,
+            2,
+            status='paid',
+            paid_date=now
+        )
         
         return {
             'seeder': seeder,
@@ -353,26 +346,15 @@ class CommonTestScenarios:
         """
         seeder = TestDataSeeder()
         
-        # Valid merchant and customer
-        merchant = seeder.create_merchant()
-        customer = seeder.create_customer()
-        
-        # Invalid user scenarios
-        invalid_user = User.objects.create_user(
-            username='invalid_user',
-            email='invalid@test.com',
-            password='testpass123',
-            user_type='invalid'
-        )
-        seeder.created_users.append(invalid_user)
-        
-        no_email_customer = User.objects.create_user(
-            username='no_email_customer',
-            email='',
-            password='testpass123',
-            user_type='customer'
-        )
-        seeder.created_users.append(no_email_customer)
+        # Valid merchant and customer plus invalid user scenarios, in one INSERT
+        merchant, customer, invalid_user, no_email_customer = seeder.create_users_bulk([
+            {'user_type': 'merchant'},
+            {'user_type': 'customer'},
+            {'user_type': 'invalid', 'username': 'invalid_user', 'email': 'invalid@test.com',
+             'first_name': '', 'last_name': ''},
+            {'user_type': 'customer', 'username': 'no_email_customer', 'email': '',
+             'first_name': '', 'last_name': ''},
+        ])
         
         # Cancelled payment plan
         cancelled_plan = seeder.create_payment_plan(
@@ -406,6 +388,7 @@ class CommonTestScenarios:
             Dict with merchant, payment plan, and installments for signals tests
         """
         seeder = TestDataSeeder()
+        today = date.today()
         
         merchant = seeder.create_merchant(
             username='signals_merchant',
@@ -417,7 +400,7 @@ class CommonTestScenarios:
             customer_email='signals_customer@test.com',
             total_amount=Decimal('600.00'),
             number_of_installments=3,
-            start_date=date.today()
+            start_date=today
         )
         
         # Create installments in pending state
@@ -427,7 +410,7 @@ class CommonTestScenarios:
                 payment_plan,
                 installment_number=i + 1,
                 status='pending',
-                due_date=date.today() + timedelta(days=(i + 1) * 30)
+                due_date=today + timedelta(days=(i + 1) * 30)
             )
             installments.append(installment)
         
@@ -1,17 +1,16 @@
 from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
-from django.core import mail
-from unittest.mock import patch, Mock
+from django.utils import timezone
+from unittest.mock import patch
 from datetime import date, timedelta
 from decimal import Decimal
 from celery import current_app
 from .models import PaymentPlan, Installment
 from .tasks import (
-    check_overdue_installments,
+    send_overdue_payment_reminders,
     send_payment_reminder,
-    send_payment_reminders,
-    send_payment_confirmation,
-    generate_merchant_report
+    send_bulk_payment_reminders,
+    generate_merchant_payment_report
 )
 
 User = get_user_model()
@@ -21,99 +20,117 @@ User = get_user_model()
 class CeleryTaskTest(TestCase):
     """Test Celery tasks"""
     
-    def setUp(self):
-        # Configure Celery for testing
+    # Amount shared by every installment these tests create
+    INSTALLMENT_AMOUNT = Decimal('250.00')
+    
+    @classmethod
+    def setUpTestData(cls):
+        # Configure Celery for testing; override_settings alone does not reach
+        # the already-configured Celery app
         current_app.conf.task_always_eager = True
         current_app.conf.task_eager_propagates = True
         
-        self.merchant = User.objects.create_user(
+        # Shared by every test and restored by TestCase's rollback
+        cls.merchant = User.objects.create_user(
             username='merchant',
             email='merchant@test.com',
             password='testpass123',
             user_type='merchant'
         )
         
-        self.plan = PaymentPlan.objects.create(
-            merchant=self.merchant,
+        cls.plan = PaymentPlan.objects.create(
+            merchant=cls.merchant,
             user_email='customer@test.com',
             total_amount=Decimal('1000.00'),
             number_of_installments=4,
             start_date=date.today()
         )
     
-    def test_check_overdue_installments_task(self):
-        """Test overdue installments check task"""
-        # Create overdue installment
-        overdue_installment = Installment.objects.create(
-            payment_plan=self.plan,
-            installment_number=1,
-            amount=Decimal('250.00'),
-            due_date=date.today() - timedelta(days=1),
+    def _make_installment(self, **overrides):
+        """Create an installment on the base plan with the shared defaults"""
+        fields = {
+            'payment_plan': self.plan,
+            'installment_number': 1,
+            'amount': self.INSTALLMENT_AMOUNT,
+        }
+        fields.update(overrides)
+        return Installment.objects.create(**fields)
+    
+    def test_send_overdue_payment_reminders_task(self):
+        """Test overdue installments are marked late and reminded"""
+        # Create an installment, then let its due date pass; saving a past-due
+        # installment would already mark it late
+        overdue_installment = self._make_installment(
+            due_date=date.today() + timedelta(days=1),
             status='pending'
         )
+        Installment.objects.filter(pk=overdue_installment.pk).update(
+            due_date=date.today() - timedelta(days=1)
+        )
         
         # Create future installment
-        future_installment = Installment.objects.create(
-            payment_plan=self.plan,
+        future_installment = self._make_installment(
             installment_number=2,
-            amount=Decimal('250.00'),
             due_date=date.today() + timedelta(days=1),
             status='pending'
         )
         
-        # Run task
-        result = check_overdue_installments.delay()
-        result_message = result.get()
-        
-        # Check results
-        overdue_installment.refresh_from_db()
-        future_installment.refresh_from_db()
-        
-        self.assertEqual(overdue_installment.status, 'late')
-        self.assertEqual(future_installment.status, 'pending')
-        self.assertIn('1', result_message)  # Should process 1 overdue installment
+        # Run task synchronously; the reminder batches still run eagerly
+        with patch('apps.payments.tasks.mock_send_email') as mock_email:
+            result = send_overdue_payment_reminders()
+        
+        # Check results with one query for both installments
+        statuses = dict(Installment.objects.filter(
+            id__in=[overdue_installment.id, future_installment.id]
+        ).values_list('id', 'status'))
+        
+        self.assertEqual(statuses[overdue_installment.id], 'late')
+        self.assertEqual(statuses[future_installment.id], 'pending')
+        self.assertEqual(result['marked_late'], 1)
+        self.assertEqual(result['overdue_reminders_sent'], 1)
+        self.assertEqual(mock_email.call_count, 1)
+        self.assertEqual(mock_email.call_args.kwargs['reminder_type'], 'overdue')
     
     def test_send_payment_reminder_task(self):
         """Test payment reminder task"""
-        installment = Installment.objects.create(
-            payment_plan=self.plan,
-            installment_number=1,
-            amount=Decimal('250.00'),
-            due_date=date.today() + timedelta(days=3)
-        )
-        
-        # Clear mail outbox
-        mail.outbox = []
+        installment = self._make_installment(due_date=date.today() + timedelta(days=3))
         
         # Run task
-        result = send_payment_reminder.delay(installment.id)
-        result_message = result.get()
+        with patch('apps.payments.tasks.mock_send_email') as mock_email:
+            result = send_payment_reminder(installment.id)
         
         # Check email was sent
-        self.assertEqual(len(mail.outbox), 1)
-        self.assertIn('Payment Reminder', mail.outbox[0].subject)
-        self.assertIn('customer@test.com', mail.outbox[0].to)
-        self.assertIn('250', mail.outbox[0].body)
-        self.assertIn('successfully', result_message)
+        mock_email.assert_called_once()
+        email = mock_email.call_args.kwargs
+        self.assertIn('Payment Reminder', email['subject'])
+        self.assertEqual(email['to_email'], 'customer@test.com')
+        self.assertIn('250', email['message'])
+        self.assertEqual(result['status'], 'sent')
+        self.assertEqual(result['days_until_due'], 3)
     
     def test_send_payment_reminder_nonexistent_installment(self):
         """Test payment reminder for non-existent installment"""
-        result = send_payment_reminder.delay(99999)
-        result_message = result.get()
+        with patch('apps.payments.tasks.mock_send_email') as mock_email:
+            result = send_payment_reminder(99999)
+        
+        self.assertIn('not found', result['error'])
+        mock_email.assert_not_called()
+    
+    def test_send_payment_reminder_skips_paid_installment(self):
+        """Test paid installments do not get a reminder"""
+        installment = self._make_installment(due_date=date.today(), status='paid', paid_date=timezone.now())
+        
+        with patch('apps.payments.tasks.mock_send_email') as mock_email:
+            result = send_payment_reminder(installment.id)
         
-        self.assertIn('not found', result_message)
-        self.assertEqual(len(mail.outbox), 0)
+        mock_email.assert_not_called()
+        self.assertIn('Skipped', result)
     
-    def test_send_payment_reminders_task(self):
+    def test_send_bulk_payment_reminders_task(self):
         """Test batch payment reminders task"""
         # Create installment due in 3 days
         reminder_date = date.today() + timedelta(days=3)
-        installment1 = Installment.objects.create(
-            payment_plan=self.plan,
-            installment_number=1,
-            amount=Decimal('250.00'),
-            due_date=reminder_date
-        )
+        self._make_installment(due_date=reminder_date)
         
         # Create another plan and installment
         plan2 = PaymentPlan.objects.create(
@@ -124,62 +141,29 @@ class CeleryTaskTest(TestCase):
             start_date=date.today()
         )
         
-        installment2 = Installment.objects.create(
-            payment_plan=plan2,
-            installment_number=1,
-            amount=Decimal('250.00'),
-            due_date=reminder_date
-        )
+        self._make_installment(payment_plan=plan2, due_date=reminder_date)
         
         # Create installment not due for reminders
-        installment3 = Installment.objects.create(
-            payment_plan=self.plan,
+        self._make_installment(
             installment_number=2,
-            amount=Decimal('250.00'),
             due_date=date.today() + timedelta(days=10)
         )
         
-        # Clear mail outbox
-        mail.outbox = []
-        
-        # Mock the individual reminder task to avoid double execution
-        with patch('apps.payments.tasks.send_payment_reminder.delay') as mock_task:
-            result = send_payment_reminders.delay()
-            result_message = result.get()
-            
-            # Should queue 2 reminder tasks
-            self.assertEqual(mock_task.call_count, 2)
-            self.assertIn('2', result_message)
-    
-    def test_send_payment_confirmation_task(self):
-        """Test payment confirmation task"""
-        installment = Installment.objects.create(
-            payment_plan=self.plan,
-            installment_number=1,
-            amount=Decimal('250.00'),
-            due_date=date.today(),
-            status='paid',
-            paid_date=date.today()
-        )
-        
-        # Clear mail outbox
-        mail.outbox = []
-        
-        # Run task
-        result = send_payment_confirmation.delay(installment.id)
-        result_message = result.get()
+        with patch('apps.payments.tasks.mock_send_email') as mock_email:
+            result = send_bulk_payment_reminders(3)
         
-        # Check email was sent
-        self.assertEqual(len(mail.outbox), 1)
-        self.assertIn('Payment Confirmation', mail.outbox[0].subject)
-        self.assertIn('customer@test.com', mail.outbox[0].to)
-        self.assertIn('250', mail.outbox[0].body)
-        self.assertIn('successfully processed', mail.outbox[0].body)
+        # Should remind only the 2 installments due in 3 days
+        self.assertEqual(result['reminders_sent'], 2)
+        self.assertEqual(mock_email.call_count, 2)
+        self.assertEqual(
+            {call.kwargs['to_email'] for call in mock_email.call_args_list},
+            {'customer@test.com', 'customer2@test.com'}
+        )
     
-    def test_generate_merchant_report_task(self):
+    def test_generate_merchant_payment_report_task(self):
         """Test merchant report generation task"""
         # Create some test data
-        plan1 = PaymentPlan.objects.create(
+        PaymentPlan.objects.create(
             merchant=self.merchant,
             user_email='user1@test.com',
             total_amount=Decimal('1000.00'),
@@ -188,7 +172,7 @@ class CeleryTaskTest(TestCase):
             status='completed'
         )
         
-        plan2 = PaymentPlan.objects.create(
+        PaymentPlan.objects.create(
             merchant=self.merchant,
             user_email='user2@test.com',
             total_amount=Decimal('500.00'),
@@ -197,16 +181,12 @@ class CeleryTaskTest(TestCase):
             status='active'
         )
         
-        # Clear mail outbox
-        mail.outbox = []
-        
         # Run task
-        result = generate_merchant_report.delay(self.merchant.id, 'monthly')
-        result_message = result.get()
-        
-        # Check email was sent
-        self.assertEqual(len(mail.outbox), 1)
-        self.assertIn('Monthly Report', mail.outbox[0].subject)
-        self.assertIn('merchant@test.com', mail.outbox[0].to)
-        self.assertIn('1500', mail.outbox[0].body)  # Total revenue
-        self.assertIn('Report sent', result_message)
\ No newline at end of file
+        with patch('apps.payments.tasks.mock_send_report') as mock_report:
+            report = generate_merchant_payment_report(self.merchant.id)
+        
+        # Check the report was delivered
+        mock_report.assert_called_once_with('merchant@test.com', report)
+        self.assertEqual(report['payment_plans']['total'], 3)
+        self.assertEqual(report['payment_plans']['completed'], 1)
+        self.assertEqual(report['financials']['total_revenue'], 2500.0)  # Total revenue
@@ -28,27 +28,29 @@ class ExampleBasicSeederUsageTestCase(APITestCase):
     for creating test data and cleaning it up.
     """
     
-    def setUp(self):
-        """Set up test with manual seeder usage"""
-        self.seeder = TestDataSeeder()
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up test data once for the class with manual seeder usage
+        
+        Each test runs in a savepoint that is rolled back afterwards, so no
+        cleanup is needed
+        """
+        cls.seeder = TestDataSeeder()
         
         # Create basic test data
-        self.merchant = self.seeder.create_merchant()
-        self.customer = self.seeder.create_customer()
-        self.payment_plan = self.seeder.create_payment_plan(
-            merchant=self.merchant,
-            customer_email=self.customer.email
+        cls.merchant = cls.seeder.create_merchant()
+        cls.customer = cls.seeder.create_customer()
+        cls.payment_plan = cls.seeder.create_payment_plan(
+            merchant=cls.merchant,
+            customer_email=cls.customer.email
         )
         
         # Create some installments
-        self.installments = []
+        cls.installments = []
         for i in range(3):
-            installment = self.seeder.create_installment(self.payment_plan)
-            self.installments.append(installment)
-    
-    def tearDown(self):
-        """Clean up test data"""
-        self.seeder.cleanup_all()
+            installment = cls.seeder.create_installment(cls.payment_plan)
+            cls.installments.append(installment)
     
     def get_jwt_token(self, user):
         """Helper method for JWT token generation"""
@@ -96,18 +98,14 @@ class ExampleScenarioBasedTestCase(APITestCase):
     to get pre-configured test data for specific testing needs.
     """
     
-    def setUp(self):
-        """Set up using predefined scenarios"""
+    @classmethod
+    def setUpTestData(cls):
+        """Set up predefined scenarios once for the class"""
         # Get comprehensive security test data
-        self.security_data = CommonTestScenarios.security_test_data()
+        cls.security_data = CommonTestScenarios.security_test_data()
         
         # Get functional test data  
-        self.functional_data = CommonTestScenarios.functional_test_data()
-    
-    def tearDown(self):
-        """Clean up all scenario data"""
-        self.security_data['seeder'].cleanup_all()
-        self.functional_data['seeder'].cleanup_all()
+        cls.functional_data = CommonTestScenarios.functional_test_data()
     
     def get_jwt_token(self, user):
         """Helper method for JWT token generation"""
@@ -170,13 +168,17 @@ class ExampleFixturesBasedTestCase(APITestCase):
     for more dynamic test data creation with easy access patterns.
     """
     
-    def setUp(self):
-        """Set up using fixtures"""
-        self.fixtures = PaymentTestFixtures()
-    
-    def tearDown(self):
-        """Clean up fixture data"""
-        self.fixtures.cleanup()
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Build the fixture scenarios once for the whole class
+        
+        TestCase rolls each test back to this data and hands every test its
+        own deep copy of cls.fixtures, so no per-test cleanup is needed
+        """
+        cls.fixtures = PaymentTestFixtures()
+        cls.fixtures.simple_merchant_customer
+        cls.fixtures.multi_merchant_setup
     
     def test_simple_merchant_customer_workflow(self):
         """Test basic merchant-customer workflow using fixtures"""
@@ -330,13 +332,10 @@ class ExampleValidationTestCase(APITestCase):
     using the validation test data.
     """
     
-    def setUp(self):
-        """Set up validation test data"""
-        self.validation_data = CommonTestScenarios.validation_test_data()
-    
-    def tearDown(self):
-        """Clean up validation data"""
-        self.validation_data['seeder'].cleanup_all()
+    @classmethod
+    def setUpTestData(cls):
+        """Set up validation test data once for the class"""
+        cls.validation_data = CommonTestScenarios.validation_test_data()
     
     def get_jwt_token(self, user):
         """Helper method for JWT token generation"""
@@ -1,4 +1,6 @@
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
@@ -20,10 +22,13 @@ User = get_user_model()
 class PaymentPlanEndpointSecurityTestCase(APITestCase):
     """Test security and access control for payment plan endpoints"""
     
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_data = CommonTestScenarios.security_test_data()
+    
     def setUp(self):
         """Set up test data using seeder"""
         self.seeder = TestDataSeeder()
-        self.test_data = CommonTestScenarios.security_test_data()
         
         # Extract commonly used objects for easy access
         self.merchant_user = self.test_data['primary_merchant']
@@ -33,11 +38,6 @@ class PaymentPlanEndpointSecurityTestCase(APITestCase):
         self.merchant_plan = self.test_data['primary_plan']
         self.other_merchant_plan = self.test_data['other_plan']
     
-    def tearDown(self):
-        """Clean up test data"""
-        if hasattr(self, 'test_data') and 'seeder' in self.test_data:
-            self.test_data['seeder'].cleanup_all()
-    
     def get_jwt_token(self, user):
         """Get JWT token for user"""
         refresh = RefreshToken.for_user(user)
@@ -203,9 +203,12 @@ class PaymentPlanEndpointSecurityTestCase(APITestCase):
 class PayInstallmentEndpointSecurityTestCase(APITestCase):
     """Test security and access control for pay installment endpoint"""
     
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_data = CommonTestScenarios.security_test_data()
+    
     def setUp(self):
         """Set up test data using seeder"""
-        self.test_data = CommonTestScenarios.security_test_data()
         
         # Extract commonly used objects for easy access
         self.merchant_user = self.test_data['primary_merchant']
@@ -223,11 +226,6 @@ class PayInstallmentEndpointSecurityTestCase(APITestCase):
         self.installment2 = self.primary_installments[1] if len(self.primary_installments) > 1 else None
         self.other_installment = self.other_installments[0] if self.other_installments else None
     
-    def tearDown(self):
-        """Clean up test data"""
-        if hasattr(self, 'test_data') and 'seeder' in self.test_data:
-            self.test_data['seeder'].cleanup_all()
-    
     def get_jwt_token(self, user):
         """Get JWT token for user"""
         refresh = RefreshToken.for_user(user)
@@ -382,19 +380,17 @@ class PayInstallmentEndpointSecurityTestCase(APITestCase):
 class PaymentPlanFunctionalTestCase(APITestCase):
     """Test payment plan functionality and business logic"""
     
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_data = CommonTestScenarios.functional_test_data()
+    
     def setUp(self):
         """Set up test data using seeder"""
-        self.test_data = CommonTestScenarios.functional_test_data()
         
         # Extract commonly used objects for easy access
         self.merchant_user = self.test_data['merchant']
         self.customer_user = self.test_data['customer']
     
-    def tearDown(self):
-        """Clean up test data"""
-        if hasattr(self, 'test_data') and 'seeder' in self.test_data:
-            self.test_data['seeder'].cleanup_all()
-    
     def get_jwt_token(self, user):
         """Get JWT token for user"""
         refresh = RefreshToken.for_user(user)
@@ -533,25 +529,93 @@ class PaymentPlanFunctionalTestCase(APITestCase):
         # Payment plan should now be completed
         payment_plan.refresh_from_db()
         self.assertEqual(payment_plan.status, 'completed')
+    
+    def test_plans_list_query_count_independent_of_plan_count(self):
+        """Test that listing plans does not issue queries per plan"""
+        self.authenticate_user(self.merchant_user)
+        url = reverse('paymentplan-list')
+        
+        def create_plan():
+            data = {
+                'user_email': self.customer_user.email,
+                'total_amount': '900.00',
+                'number_of_installments': 3,
+                'start_date': (date.today() + timedelta(days=1)).isoformat(),
+                'interest_rate': '0'
+            }
+            response = self.client.post(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return PaymentPlan.objects.filter(merchant=self.merchant_user).latest('id').id
+        
+        plan_id = create_plan()
+        with CaptureQueriesContext(connection) as single_plan_queries:
+            self.client.get(url)
+        
+        create_plan()
+        create_plan()
+        
+        # Mark one installment paid without going through the API
+        paid_installment = Installment.objects.filter(payment_plan_id=plan_id).first()
+        Installment.objects.filter(id=paid_installment.id).update(status='paid')
+        
+        with CaptureQueriesContext(connection) as many_plan_queries:
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(many_plan_queries), len(single_plan_queries))
+        
+        plans = {plan['id']: plan for plan in response.data['results']}
+        paid_plan = plans[plan_id]
+        self.assertEqual(paid_plan['paid_installments_count'], 1)
+        self.assertEqual(paid_plan['remaining_amount'], Decimal('600.00'))
+        self.assertEqual(len(paid_plan['installments']), 3)
+    
+    def test_installment_amount_recalculated_only_when_inputs_change(self):
+        """Test the stored installment amount tracks its inputs and falls back when missing"""
+        plan = PaymentPlan.objects.create(
+            merchant=self.merchant_user,
+            user_email=self.customer_user.email,
+            total_amount=Decimal('900.00'),
+            number_of_installments=3,
+            start_date=date.today(),
+            interest_rate=Decimal('0')
+        )
+        self.assertEqual(plan.installment_amount, Decimal('300.00'))
+        
+        # Rows written with update() never stored the PMT result
+        PaymentPlan.objects.filter(pk=plan.pk).update(installment_amount=None)
+        self.authenticate_user(self.merchant_user)
+        response = self.client.get(reverse('paymentplan-detail', args=[plan.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(str(response.data['installment_amount'])), Decimal('300.00'))
+        
+        # A full save with unchanged inputs keeps the stored amount as loaded
+        plan = PaymentPlan.objects.get(pk=plan.pk)
+        plan.installment_amount = Decimal('1.00')
+        plan.save()
+        self.assertEqual(PaymentPlan.objects.get(pk=plan.pk).installment_amount, Decimal('1.00'))
+        
+        # Changing an input recalculates it
+        plan.total_amount = Decimal('1200.00')
+        plan.save()
+        self.assertEqual(PaymentPlan.objects.get(pk=plan.pk).installment_amount, Decimal('400.00'))
 
 
 class PaymentSignalsTestCase(TestCase):
     """Test Django signals for payment plan and installment updates"""
     
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_data = CommonTestScenarios.signals_test_data()
+    
     def setUp(self):
         """Set up test data"""
         self.seeder = TestDataSeeder()
-        self.test_data = CommonTestScenarios.signals_test_data()
         
         self.merchant_user = self.test_data['merchant']
         self.payment_plan = self.test_data['payment_plan']
         self.installments = self.test_data['installments']
     
-    def tearDown(self):
-        """Clean up test data"""
-        if hasattr(self, 'test_data') and 'seeder' in self.test_data:
-            self.test_data['seeder'].cleanup_all()
-    
     def test_installment_save_triggers_payment_plan_status_update(self):
         """Test that saving an installment triggers payment plan status update signal"""
         # Initially, payment plan should be active
@@ -682,6 +746,27 @@ class PaymentSignalsTestCase(TestCase):
         # If 2 out of 3 original installments are paid, plan should stay completed
         self.assertEqual(self.payment_plan.status, 'completed')
     
+    def test_installment_deletion_status_survives_later_saves(self):
+        """Deleting an installment and re-saving another keeps the plan status stable"""
+        # Pay two of the three installments
+        for installment in self.installments[:2]:
+            installment.status = 'paid'
+            installment.save()
+        
+        # Deleting the only unpaid installment leaves a fully paid schedule
+        self.installments[2].delete()
+        
+        self.payment_plan.refresh_from_db()
+        self.assertEqual(self.payment_plan.number_of_installments, 2)
+        self.assertEqual(self.payment_plan.status, 'completed')
+        
+        # Saving a paid installment again must not reactivate the plan
+        paid_installment = Installment.objects.get(pk=self.installments[0].pk)
+        paid_installment.save()
+        
+        self.payment_plan.refresh_from_db()
+        self.assertEqual(self.payment_plan.status, 'completed')
+    
     def test_overdue_report_generation(self):
         """Test the overdue installments report generation"""
         from .signals import get_overdue_installments_report
@@ -769,19 +854,17 @@ class PaymentSignalsTestCase(TestCase):
 class InterestRateEndpointTestCase(APITestCase):
     """Test interest rate endpoint for merchants"""
     
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_data = CommonTestScenarios.security_test_data()
+    
     def setUp(self):
         """Set up test data"""
         self.seeder = TestDataSeeder()
-        self.test_data = CommonTestScenarios.security_test_data()
         
         self.merchant_user = self.test_data['primary_merchant']
         self.customer_user = self.test_data['primary_customer']
     
-    def tearDown(self):
-        """Clean up test data"""
-        if hasattr(self, 'test_data') and 'seeder' in self.test_data:
-            self.test_data['seeder'].cleanup_all()
-    
     def get_jwt_token(self, user):
         """Get JWT token for user"""
         refresh = RefreshToken.for_user(user)
@@ -838,10 +921,13 @@ class InterestRateEndpointTestCase(APITestCase):
 class PaymentTimingEdgeCasesTestCase(APITestCase):
     """Test payment timing edge cases including early payments"""
     
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_data = CommonTestScenarios.security_test_data()
+    
     def setUp(self):
         """Set up test data"""
         self.seeder = TestDataSeeder()
-        self.test_data = CommonTestScenarios.security_test_data()
         
         self.merchant_user = self.test_data['primary_merchant']
         self.customer_user = self.test_data['primary_customer']
@@ -871,11 +957,6 @@ class PaymentTimingEdgeCasesTestCase(APITestCase):
             )
             self.installments.append(installment)
     
-    def tearDown(self):
-        """Clean up test data"""
-        if hasattr(self, 'test_data') and 'seeder' in self.test_data:
-            self.test_data['seeder'].cleanup_all()
-    
     def get_jwt_token(self, user):
         """Get JWT token for user"""
         refresh = RefreshToken.for_user(user)
@@ -1043,19 +1124,17 @@ class PaymentTimingEdgeCasesTestCase(APITestCase):
 class HighValuePaymentTestCase(APITestCase):
     """Test high-value payments like 200,000 SAR loans"""
     
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_data = CommonTestScenarios.security_test_data()
+    
     def setUp(self):
         """Set up test data"""
         self.seeder = TestDataSeeder()
-        self.test_data = CommonTestScenarios.security_test_data()
         
         self.merchant_user = self.test_data['primary_merchant']
         self.customer_user = self.test_data['primary_customer']
     
-    def tearDown(self):
-        """Clean up test data"""
-        if hasattr(self, 'test_data') and 'seeder' in self.test_data:
-            self.test_data['seeder'].cleanup_all()
-    
     def get_jwt_token(self, user):
         """Get JWT token for user"""
         refresh = RefreshToken.for_user(user)
@@ -1304,19 +1383,17 @@ class HighValuePaymentTestCase(APITestCase):
 class LongTermPaymentFlowTestCase(APITestCase):
     """Test long-term payment flows over 12+ months"""
     
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_data = CommonTestScenarios.security_test_data()
+    
     def setUp(self):
         """Set up test data"""
         self.seeder = TestDataSeeder()
-        self.test_data = CommonTestScenarios.security_test_data()
         
         self.merchant_user = self.test_data['primary_merchant']
         self.customer_user = self.test_data['primary_customer']
     
-    def tearDown(self):
-        """Clean up test data"""
-        if hasattr(self, 'test_data') and 'seeder' in self.test_data:
-            self.test_data['seeder'].cleanup_all()
-    
     def get_jwt_token(self, user):
         """Get JWT token for user"""
         refresh = RefreshToken.for_user(user)
@@ -1650,3 +1727,32 @@ class LongTermPaymentFlowTestCase(APITestCase):
             
             # But not excessively higher (sanity check)
             self.assertLess(total_amount, plan.total_amount * Decimal('2.5'))
+
+
+class CommonTestScenariosQueryCountTestCase(TestCase):
+    """Bound the number of queries each shared test scenario issues"""
+    
+    def assertMaxQueries(self, limit, func):
+        """Run func and fail if it issues more than limit queries"""
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        self.assertLessEqual(
+            len(queries), limit,
+            '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+    
+    def test_security_test_data_query_count(self):
+        """Users in one INSERT, installments in one INSERT per plan"""
+        self.assertMaxQueries(7, CommonTestScenarios.security_test_data)
+    
+    def test_functional_test_data_query_count(self):
+        """Mixed-state installments are saved one by one, completed ones in bulk"""
+        self.assertMaxQueries(15, CommonTestScenarios.functional_test_data)
+    
+    def test_validation_test_data_query_count(self):
+        """All validation users share a single INSERT"""
+        self.assertMaxQueries(5, CommonTestScenarios.validation_test_data)
+    
+    def test_signals_test_data_query_count(self):
+        """Signals scenario keeps per-row saves so post_save handlers run"""
+        self.assertMaxQueries(9, CommonTestScenarios.signals_test_data)
@@ -1,4 +1,5 @@
 from datetime import date
+from functools import lru_cache
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
 import logging
 from django.conf import settings
@@ -14,6 +15,9 @@ from .models import Installment
 
 logger = logging.getLogger(__name__)
 
+# Distinct (principal, rate, periods, tenor) schedules kept in memory
+AMORTIZATION_CACHE_SIZE = 4096
+
 def calculate_pmt(principal, annual_rate, periods, tenor_type='month'):
     """Calculate payment including principal and interest using PMT formula"""
     try:
@@ -85,69 +89,8 @@ def calculate_amortization(principal, annual_rate, periods, tenor_type='month'):
         principal = Decimal(str(principal))
         annual_rate = Decimal(str(annual_rate))
         
-        # Handle zero interest rate
-        if annual_rate == 0:
-            installment = (principal / Decimal(periods)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            return [(installment, installment, Decimal('0.00')) for _ in range(periods)]
-        
-        # Calculate periods per year
-        periods_mapping = {'month': 12, 'week': 52, 'day': 360}
-        periods_per_year = Decimal(periods_mapping[tenor_type])
-        
-        # Calculate rate per period
-        rate = annual_rate / Decimal(100) / periods_per_year
-        rate_float = float(rate)
-        remaining_principal = float(principal)
-        schedule = []
-        
-        # Use consistent PMT calculation
-        pmt_amount = float(calculate_pmt(principal, annual_rate, periods, tenor_type))
-        
-        for period in range(1, periods + 1):
-            try:
-                # Calculate interest component
-                interest_amount = remaining_principal * rate_float
-                
-                # Calculate principal component
-                principal_component_float = pmt_amount - interest_amount
-                
-                # Handle final period adjustment to ensure total principal equals original
-                if period == periods:
-                    # Adjust final principal to match remaining balance
-                    principal_component_float = remaining_principal
-                    total_pmt_float = principal_component_float + interest_amount
-                else:
-                    total_pmt_float = pmt_amount
-                
-                # Convert to Decimal and round
-                interest = Decimal(str(interest_amount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                principal_component = Decimal(str(principal_component_float)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                total_pmt = Decimal(str(total_pmt_float)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                
-                # Validate amounts
-                if interest < 0:
-                    interest = Decimal('0.00')
-                if principal_component <= 0:
-                    raise ValidationError(f"Invalid principal component for period {period}")
-                
-                schedule.append((total_pmt, principal_component, interest))
-                remaining_principal -= float(principal_component)
-                
-                # Ensure remaining principal doesn't go negative (except for final period)
-                if remaining_principal < -0.01 and period < periods:
-                    logger.warning(f"Remaining principal went negative: {remaining_principal}")
-                    remaining_principal = 0
-                    
-            except (ValueError, TypeError, InvalidOperation) as e:
-                logger.error(f"Error calculating amortization for period {period}: {e}")
-                raise ValidationError(f"Amortization calculation failed for period {period}")
-        
-        # Validate schedule integrity
-        total_principal = sum(payment[1] for payment in schedule)
-        if abs(float(total_principal) - float(principal)) > 0.10:  # Allow small rounding differences
-            logger.warning(f"Principal sum mismatch: {total_principal} vs {principal}")
-        
-        return schedule
+        # Schedules depend only on these four values, so identical loans share one
+        return list(_amortization_schedule(principal, annual_rate, periods, tenor_type))
         
     except ValidationError:
         raise
@@ -155,6 +98,78 @@ def calculate_amortization(principal, annual_rate, periods, tenor_type='month'):
         logger.error(f"Unexpected error in calculate_amortization: {e}")
         raise ValidationError("An unexpected error occurred during amortization calculation")
 
+# Least recently used schedules are evicted first; entries are a dozen small
+# tuples each, so this bounds the cache to a few MB
+@lru_cache(maxsize=AMORTIZATION_CACHE_SIZE)
+def _amortization_schedule(principal, annual_rate, periods, tenor_type):
+    """
+    Build the amortization schedule for validated Decimal inputs
+    Returns an immutable tuple so cached schedules can be shared between callers
+    """
+    # Handle zero interest rate
+    if annual_rate == 0:
+        installment = (principal / Decimal(periods)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        return tuple((installment, installment, Decimal('0.00')) for _ in range(periods))
+    
+    # Calculate periods per year
+    periods_mapping = {'month': 12, 'week': 52, 'day': 360}
+    periods_per_year = Decimal(periods_mapping[tenor_type])
+    
+    # Calculate rate per period
+    rate = annual_rate / Decimal(100) / periods_per_year
+    rate_float = float(rate)
+    remaining_principal = float(principal)
+    schedule = []
+    
+    # Use consistent PMT calculation
+    pmt_amount = float(calculate_pmt(principal, annual_rate, periods, tenor_type))
+    
+    for period in range(1, periods + 1):
+        try:
+            # Calculate interest component
+            interest_amount = remaining_principal * rate_float
+            
+            # Calculate principal component
+            principal_component_float = pmt_amount - interest_amount
+            
+            # Handle final period adjustment to ensure total principal equals original
+            if period == periods:
+                # Adjust final principal to match remaining balance
+                principal_component_float = remaining_principal
+                total_pmt_float = principal_component_float + interest_amount
+            else:
+                total_pmt_float = pmt_amount
+            
+            # Convert to Decimal and round
+            interest = Decimal(str(interest_amount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            principal_component = Decimal(str(principal_component_float)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            total_pmt = Decimal(str(total_pmt_float)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            
+            # Validate amounts
+            if interest < 0:
+                interest = Decimal('0.00')
+            if principal_component <= 0:
+                raise ValidationError(f"Invalid principal component for period {period}")
+            
+            schedule.append((total_pmt, principal_component, interest))
+            remaining_principal -= float(principal_component)
+            
+            # Ensure remaining principal doesn't go negative (except for final period)
+            if remaining_principal < -0.01 and period < periods:
+                logger.warning(f"Remaining principal went negative: {remaining_principal}")
+                remaining_principal = 0
+                
+        except (ValueError, TypeError, InvalidOperation) as e:
+            logger.error(f"Error calculating amortization for period {period}: {e}")
+            raise ValidationError(f"Amortization calculation failed for period {period}")
+    
+    # Validate schedule integrity
+    total_principal = sum(payment[1] for payment in schedule)
+    if abs(float(total_principal) - float(principal)) > 0.10:  # Allow small rounding differences
+        logger.warning(f"Principal sum mismatch: {total_principal} vs {principal}")
+    
+    return tuple(schedule)
+
 def mark_overdue_installments():
     """
     Utility function to mark overdue installments as 'late'
@@ -5,6 +5,7 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from datetime import date
 import logging
 from .models import PaymentPlan, Installment
 from .serializers import (
@@ -35,16 +36,22 @@ class PaymentPlanViewSet(viewsets.ModelViewSet):
         
         if user.user_type == 'merchant':
             # Merchants see only plans they created
-            return PaymentPlan.objects.filter(merchant=user).select_related('merchant')
+            return PaymentPlan.optimized_queryset().filter(merchant=user)
         elif user.user_type == 'user':
             # Users see only plans assigned to their email
             if not user.email:
                 return PaymentPlan.objects.none()
-            return PaymentPlan.objects.filter(user_email=user.email).select_related('merchant')
+            return PaymentPlan.optimized_queryset().filter(user_email=user.email)
         else:
             # Invalid user_type - return empty queryset
             return PaymentPlan.objects.none()
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Shared by every installment serialized in this request
+        context['today'] = date.today()
+        return context
+    
     def get_permissions(self):
         if self.action == 'create':
             return [permissions.IsAuthenticated(), IsMerchant()]
@@ -71,7 +78,10 @@ def pay_installment(request, installment_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        installment = get_object_or_404(Installment, id=installment_id)
+        # Permission checks below read the plan's owner and status
+        installment = get_object_or_404(
+            Installment.objects.select_related('payment_plan'), id=installment_id
+        )
         
         # Check permissions
         permission = CanPayInstallment()
@@ -149,6 +149,28 @@ DEFAULT_INTEREST_RATE = config('DEFAULT_INTEREST_RATE', default=47.0, cast=float
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Cache Configuration: Redis (separate database from Celery) when CACHE_URL is
+# set, otherwise a per-process memory cache
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'bnpl',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'bnpl',
+        }
+    }
+
+# Analytics responses are cached per merchant for this many seconds
+ANALYTICS_CACHE_TIMEOUT = config('ANALYTICS_CACHE_TIMEOUT', default=60, cast=int)
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -181,9 +203,11 @@ CELERY_BEAT_SCHEDULE = {
 # Celery Task Routes
 CELERY_TASK_ROUTES = {
     'apps.payments.tasks.send_payment_reminder': {'queue': 'reminders'},
+    'apps.payments.tasks.send_payment_reminder_batch': {'queue': 'reminders'},
     'apps.payments.tasks.send_bulk_payment_reminders': {'queue': 'reminders'},
     'apps.payments.tasks.send_overdue_payment_reminders': {'queue': 'urgent'},
     'apps.payments.tasks.daily_payment_reminders': {'queue': 'reminders'},
+    'apps.payments.tasks.summarize_daily_payment_reminders': {'queue': 'reminders'},
     'apps.payments.tasks.generate_merchant_payment_report': {'queue': 'reports'},
 }
 
@@ -192,3 +216,8 @@ CELERY_TASK_ALWAYS_EAGER = False  # Set to True for development/testing
 CELERY_TASK_EAGER_PROPAGATES = True
 CELERY_TASK_IGNORE_RESULT = False
 CELERY_TASK_STORE_EAGER_RESULT = True
+
+# Reminder tasks wait on email I/O; fetch one task at a time and ack after it
+# finishes so slow reminders don't hold back tasks queued behind them
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
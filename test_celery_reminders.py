@@ -210,16 +210,8 @@ def test_daily_payment_reminders():
     try:
         result = daily_payment_reminders()
         
-        if isinstance(result, dict) and 'total_reminders_sent' in result:
-            total = result['total_reminders_sent']
-            print(f"✅ PASS: Daily batch completed - {total} total reminders")
-            
-            # Show breakdown
-            details = result.get('details', {})
-            for reminder_type, data in details.items():
-                count = data.get('reminders_sent', 0) or data.get('overdue_reminders_sent', 0)
-                print(f"  {reminder_type}: {count} reminders")
-            
+        if isinstance(result, dict) and 'chord_id' in result:
+            print(f"✅ PASS: Daily batches queued - chord {result['chord_id']}")
             return True
         else:
             print(f"❌ FAIL: Unexpected daily batch result: {result}")